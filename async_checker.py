@@ -0,0 +1,95 @@
+"""StatusChecker for asyncio applications.
+
+The supported embedding of StatusChecker in an event loop is to run its
+calls in a thread with asyncio.to_thread, this is what this checker does:
+the search of the builds, the requests, the parsing and the rendering run
+in that thread (and its pool of max_workers threads), so the event loop
+is never blocked. The checker is not rewritten on asyncio, its requests
+are made by the usual Transport."""
+import asyncio
+from datetime import date
+from status_checker import StatusChecker
+
+
+class AsyncStatusChecker:
+    """Awaitable variant of StatusChecker, it takes the same arguments.
+
+    Calls of one checker run one at a time, each in one thread of the
+    default executor of the event loop. The number of calls running at once
+    in a process is so limited by the threads of that executor. Use one
+    checker per group of slots to monitor them at the same time."""
+
+    def __init__(
+        self,
+        *args,
+        **kwargs,
+    ):
+        self.checker = StatusChecker(*args, **kwargs)
+        # created on the event loop of the first call (Python < 3.10)
+        self._lock = None
+
+    async def _run(
+        self,
+        method,
+        *args,
+        **kwargs,
+    ):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+    async def get_current_builds(self) -> dict:
+        """Return the latest build id of each slot."""
+        await self._run(self.checker.get_current_builds)
+        return dict(self.checker._slots)
+
+    async def report(
+        self,
+        date_to_check: date = None,
+        days: int = 1,
+        html: bool = False,
+        changes_only: bool = False,
+    ) -> (str, dict, dict):
+        return await self._run(
+            self.checker.report,
+            date_to_check,
+            days,
+            html,
+            changes_only,
+        )
+
+    async def check_status(
+        self,
+        date_to_check: date = None,
+        days: int = 1,
+        html: bool = False,
+        filepath: str = "",
+        changes_only: bool = False,
+    ):
+        await self._run(
+            self.checker.check_status,
+            date_to_check,
+            days,
+            html,
+            filepath,
+            changes_only,
+        )
+
+    async def discover(
+        self,
+        builds: int = 1,
+    ) -> ([], []):
+        return await self._run(self.checker.discover, builds)
+
+    async def refresh(self):
+        await self._run(self.checker.refresh)
+
+    async def close(self):
+        await self._run(self.checker._transport.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,104 @@
+import bisect
+import threading
+from cache import SummaryCache
+
+
+class BuildIndex:
+    """Sorted mapping of build_id -> date for each slot.
+
+    It is filled lazily with every summary seen by the checker
+    and persisted in the cache, as the date of a build never changes,
+    and neither does the state of an aborted build. A build still
+    running can be aborted later, so it is known as aborted only once
+    a summary says so."""
+
+    def __init__(
+        self,
+        cache: SummaryCache = None,
+    ):
+        self._cache = cache
+        self._lock = threading.Lock()
+        self._dates = {}
+        self._aborted = {}
+        self._ids = {}
+
+    def _load(
+        self,
+        slot: str,
+    ):
+        if slot in self._ids:
+            return
+        self._dates[slot] = {}
+        self._aborted[slot] = {}
+        self._ids[slot] = []
+        if self._cache:
+            for build_id, build_date, aborted in self._cache.get_builds(slot):
+                self._dates[slot][build_id] = build_date
+                self._aborted[slot][build_id] = aborted
+            self._ids[slot] = sorted(self._dates[slot])
+
+    def add(
+        self,
+        slot: str,
+        build_id: int,
+        build_date: str,
+        aborted: bool,
+    ):
+        with self._lock:
+            self._load(slot)
+            if (
+                self._dates[slot].get(build_id) == build_date
+                and self._aborted[slot][build_id] == aborted
+            ):
+                return
+            if build_id not in self._dates[slot]:
+                bisect.insort(self._ids[slot], build_id)
+            self._dates[slot][build_id] = build_date
+            self._aborted[slot][build_id] = aborted
+        if self._cache:
+            self._cache.put_build(slot, build_id, build_date, aborted)
+
+    def get_date(
+        self,
+        slot: str,
+        build_id: int,
+    ) -> str:
+        with self._lock:
+            self._load(slot)
+            return self._dates[slot].get(build_id)
+
+    def is_aborted(
+        self,
+        slot: str,
+        build_id: int,
+    ) -> bool:
+        with self._lock:
+            self._load(slot)
+            return self._aborted[slot].get(build_id, False)
+
+    def latest(
+        self,
+        slot: str,
+    ) -> (int, str):
+        """Return the most recent known build id and its date,
+        or (0, None) if no build of the slot is known."""
+        with self._lock:
+            self._load(slot)
+            if not self._ids[slot]:
+                return 0, None
+            build_id = self._ids[slot][-1]
+            return build_id, self._dates[slot][build_id]
+
+    def known_ids(
+        self,
+        slot: str,
+        low: int,
+        high: int,
+    ) -> list:
+        """Return the sorted known build ids between low and high."""
+        with self._lock:
+            self._load(slot)
+            ids = self._ids[slot]
+            first = bisect.bisect_left(ids, low)
+            last = bisect.bisect_right(ids, high)
+            return ids[first:last]
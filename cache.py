@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "nightly-status-checker")
+
+
+class SummaryCache:
+    """Persistent store of the build summaries keyed by (slot, build_id).
+
+    Only builds that cannot change anymore should be put here,
+    the summaries are kept until they get older than `max_age_days`
+    or the cache grows above `max_entries`."""
+
+    filename = "summaries.sqlite"
+
+    max_age_days = 120
+
+    max_entries = 5000
+
+    def __init__(
+        self,
+        path: str = "",
+        refresh: bool = False,
+        max_age_days: int = 0,
+        max_entries: int = 0,
+    ):
+        self.path = path or os.path.join(default_cache_dir(), self.filename)
+        # with refresh, stored summaries are ignored but overwritten
+        self.refresh = refresh
+        if max_age_days:
+            self.max_age_days = max_age_days
+        if max_entries:
+            self.max_entries = max_entries
+        dirname = os.path.dirname(self.path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                "slot TEXT NOT NULL, "
+                "build_id INTEGER NOT NULL, "
+                "stored REAL NOT NULL, "
+                "data BLOB NOT NULL, "
+                "PRIMARY KEY (slot, build_id))"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS builds ("
+                "slot TEXT NOT NULL, "
+                "build_id INTEGER NOT NULL, "
+                "date TEXT NOT NULL, "
+                "aborted INTEGER NOT NULL, "
+                "PRIMARY KEY (slot, build_id))"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, "
+                "etag TEXT NOT NULL, "
+                "last_modified TEXT NOT NULL, "
+                "data BLOB NOT NULL)"
+            )
+        self.evict()
+
+    def get(
+        self,
+        slot: str,
+        build_id: int,
+    ) -> dict:
+        if self.refresh:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM summaries WHERE slot = ? AND build_id = ?",
+                (slot, build_id),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(
+        self,
+        slot: str,
+        build_id: int,
+        summary: dict,
+    ):
+        data = zlib.compress(json.dumps(summary).encode("utf-8"))
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)",
+                (slot, build_id, time.time(), data),
+            )
+
+    def get_builds(
+        self,
+        slot: str,
+    ) -> list:
+        """Return (build_id, date, aborted) of the known builds of the slot."""
+        with self._lock:
+            return [
+                (build_id, build_date, bool(aborted))
+                for build_id, build_date, aborted in self._db.execute(
+                    "SELECT build_id, date, aborted FROM builds "
+                    "WHERE slot = ?",
+                    (slot,),
+                )
+            ]
+
+    def put_build(
+        self,
+        slot: str,
+        build_id: int,
+        build_date: str,
+        aborted: bool,
+    ):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO builds VALUES (?, ?, ?, ?)",
+                (slot, build_id, build_date, int(aborted)),
+            )
+
+    def get_page(
+        self,
+        url: str,
+    ) -> tuple:
+        """Return (etag, last_modified, content) of the stored page."""
+        if self.refresh:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, data FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], zlib.decompress(row[2])
+
+    def put_page(
+        self,
+        url: str,
+        etag: str,
+        last_modified: str,
+        content: bytes,
+    ):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)",
+                (url, etag, last_modified, zlib.compress(content)),
+            )
+
+    def evict(self):
+        """Remove the expired entries and the oldest ones
+        above the size limit."""
+        oldest = time.time() - self.max_age_days * 24 * 3600
+        with self._lock, self._db:
+            expired = self._db.execute(
+                "DELETE FROM summaries WHERE stored < ?", (oldest,)
+            ).rowcount
+            overflow = self._db.execute(
+                "DELETE FROM summaries WHERE rowid NOT IN ("
+                "SELECT rowid FROM summaries "
+                "ORDER BY stored DESC, rowid DESC LIMIT ?)",
+                (self.max_entries,),
+            ).rowcount
+        if expired or overflow:
+            logging.debug(
+                f"Evicted {expired + overflow} summaries from '{self.path}'."
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,130 @@
+"""Machine-readable output of the build results, one row per
+(slot, date, build_id, project, platform)."""
+import json
+import logging
+import sys
+from datetime import date
+from history import HistoryStore
+
+FORMATS = ("json", "ndjson", "parquet")
+
+# counter in the summary -> column, as in the history
+COUNTERS = HistoryStore.counters
+
+COLUMNS = (
+    ("slot", "date", "build_id", "project", "platform")
+    + tuple(COUNTERS.values())
+    + ("failed_MRs",)
+)
+
+# rows written at once to a Parquet file
+parquet_batch_size = 10000
+
+
+def records(
+    slot: str,
+    day: date,
+    build_id: int,
+    results,
+):
+    """Yield the rows of the BuildResults of the build,
+    unknown counters are None."""
+    counters = {
+        column: (
+            results.counter(name).tolist(),
+            results.known(name).tolist(),
+        )
+        for name, column in COUNTERS.items()
+    }
+    day = day.strftime("%Y-%m-%d")
+    for row, (project, failed_MRs) in enumerate(
+        zip(results.projects, results.failed_MRs)
+    ):
+        failed_MRs = [mr.id for mr in failed_MRs]
+        for col, platform in enumerate(results.platforms):
+            record = {
+                "slot": slot,
+                "date": day,
+                "build_id": build_id,
+                "project": project,
+                "platform": platform,
+            }
+            for column, (values, known) in counters.items():
+                record[column] = values[row][col] if known[row][col] else None
+            record["failed_MRs"] = failed_MRs
+            yield record
+
+
+def _write_json(
+    rows,
+    f,
+):
+    """Write a JSON array without holding all the rows in memory."""
+    f.write("[")
+    separator = "\n"
+    for row in rows:
+        f.write(separator + json.dumps(row))
+        separator = ",\n"
+    f.write("\n]\n")
+
+
+def _write_ndjson(
+    rows,
+    f,
+):
+    for row in rows:
+        f.write(json.dumps(row) + "\n")
+
+
+def _write_parquet(
+    rows,
+    filepath: str,
+):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        msg = "Writing Parquet files requires the 'pyarrow' package."
+        logging.error(msg)
+        raise ValueError(msg)
+    if not filepath:
+        msg = "Parquet files cannot be written to the standard output."
+        logging.error(msg)
+        raise ValueError(msg)
+    schema = pa.schema(
+        [
+            ("slot", pa.string()),
+            ("date", pa.string()),
+            ("build_id", pa.int64()),
+            ("project", pa.string()),
+            ("platform", pa.string()),
+        ]
+        + [(column, pa.int64()) for column in COUNTERS.values()]
+        + [("failed_MRs", pa.list_(pa.int64()))]
+    )
+    with pq.ParquetWriter(filepath, schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= parquet_batch_size:
+                writer.write_table(pa.Table.from_pylist(batch, schema))
+                batch = []
+        writer.write_table(pa.Table.from_pylist(batch, schema))
+
+
+def write(
+    rows,
+    fmt: str,
+    filepath: str = "",
+):
+    """Write the rows in the format to the file, or to the standard
+    output without filepath. Rows are written as they come."""
+    if fmt == "parquet":
+        _write_parquet(rows, filepath)
+        return
+    writer = {"json": _write_json, "ndjson": _write_ndjson}[fmt]
+    if not filepath:
+        writer(rows, sys.stdout)
+        return
+    with open(filepath, "w") as f:
+        writer(rows, f)
@@ -0,0 +1,127 @@
+import os
+import sqlite3
+import threading
+from cache import default_cache_dir
+from datetime import (
+    date,
+    timedelta,
+)
+
+
+class HistoryStore:
+    """Local record of the build and test counters of every
+    (slot, build_id, project, platform) seen in the fetched summaries."""
+
+    filename = "history.sqlite"
+
+    # result name in the summary -> column of the store
+    counters = {
+        "warnings": "warnings",
+        "errors": "errors",
+        "PASS": "passed",
+        "FAIL": "failed",
+    }
+
+    def __init__(
+        self,
+        path: str = "",
+    ):
+        self.path = path or os.path.join(default_cache_dir(), self.filename)
+        dirname = os.path.dirname(self.path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "slot TEXT NOT NULL, "
+                "build_id INTEGER NOT NULL, "
+                "date TEXT NOT NULL, "
+                "project TEXT NOT NULL, "
+                "platform TEXT NOT NULL, "
+                "warnings INTEGER, "
+                "errors INTEGER, "
+                "passed INTEGER, "
+                "failed INTEGER, "
+                "PRIMARY KEY (slot, build_id, project, platform))"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS results_by_project "
+                "ON results (project, date)"
+            )
+
+    def record(
+        self,
+        slot: str,
+        build_id: int,
+        summary: dict,
+    ):
+        """Store the counters of the enabled projects of the build,
+        unknown counters are stored as NULL."""
+        if summary["aborted"]:
+            return
+        rows = []
+        for project in summary.get("projects", []):
+            if not project.get("enabled") or not project.get("results"):
+                continue
+            for platform, results in project["results"].items():
+                values = dict.fromkeys(self.counters.values())
+                for check in (results or {}).values():
+                    if not isinstance(check, dict):
+                        continue
+                    for name, column in self.counters.items():
+                        if isinstance(check.get(name), int):
+                            values[column] = check[name]
+                rows.append(
+                    (
+                        slot,
+                        build_id,
+                        summary["date"],
+                        project["name"],
+                        platform,
+                        values["warnings"],
+                        values["errors"],
+                        values["passed"],
+                        values["failed"],
+                    )
+                )
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO results "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def trends(
+        self,
+        project: str,
+        platform: str = "",
+        slots: list = (),
+        days: int = 90,
+        until: date = None,
+    ) -> list:
+        """Return (date, slot, build_id, platform, warnings, errors,
+        passed, failed) of the project over the last days. The platform
+        matches any platform name containing it."""
+        until = until or date.today()
+        since = until - timedelta(days=days - 1)
+        query = (
+            "SELECT date, slot, build_id, platform, "
+            "warnings, errors, passed, failed FROM results "
+            "WHERE project = ? AND date BETWEEN ? AND ?"
+        )
+        params = [project, since.isoformat(), until.isoformat()]
+        if platform:
+            query += " AND instr(platform, ?) > 0"
+            params.append(platform)
+        if slots:
+            query += f" AND slot IN ({', '.join('?' * len(slots))})"
+            params += list(slots)
+        query += " ORDER BY date, slot, build_id, platform"
+        with self._lock:
+            return self._db.execute(query, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+from collections import (
+    defaultdict,
+    deque,
+)
+from contextlib import contextmanager
+
+
+class Profiler:
+    """Counts and times the phases of the checker and its requests.
+
+    Phases running in several threads at once are summed up,
+    so their total time can be longer than the wall time."""
+
+    # only the most recent requests are kept in detail
+    max_requests = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self.phases = defaultdict(lambda: [0, 0.0])
+        self.requests = deque(maxlen=self.max_requests)
+        self.requests_total = {"count": 0, "bytes": 0, "seconds": 0.0}
+        self.max_latency = 0.0
+        self.lookups = defaultdict(lambda: 0)
+
+    @contextmanager
+    def phase(
+        self,
+        name: str,
+    ):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.phases[name][0] += 1
+                self.phases[name][1] += seconds
+
+    def request(
+        self,
+        url: str,
+        size: int,
+        seconds: float,
+        status: int,
+    ):
+        with self._lock:
+            self.requests_total["count"] += 1
+            self.requests_total["bytes"] += size
+            self.requests_total["seconds"] += seconds
+            self.max_latency = max(self.max_latency, seconds)
+            self.requests.append(
+                {
+                    "url": url,
+                    "bytes": size,
+                    "seconds": seconds,
+                    "status": status,
+                }
+            )
+
+    def lookup(
+        self,
+        source: str,
+    ):
+        """Count where a summary was found: 'memory', 'cache' or 'network'."""
+        with self._lock:
+            self.lookups[source] += 1
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "wall_seconds": time.perf_counter() - self._start,
+                "phases": {
+                    name: {"count": count, "seconds": seconds}
+                    for name, (count, seconds) in self.phases.items()
+                },
+                "lookups": dict(self.lookups),
+                "requests_total": dict(
+                    self.requests_total,
+                    max_seconds=self.max_latency,
+                ),
+                "requests": list(self.requests),
+            }
+
+    def summary(self) -> str:
+        from tabulate import tabulate
+
+        profile = self.to_dict()
+        rows = [
+            [name, values["count"], f"{values['seconds']:.3f}"]
+            for name, values in profile["phases"].items()
+        ]
+        total = profile["requests_total"]
+        if total["count"]:
+            rows.append(
+                ["requests", total["count"], f"{total['seconds']:.3f}"]
+            )
+            rows.append(["  max latency", "", f"{total['max_seconds']:.3f}"])
+            rows.append(
+                ["  downloaded kB", "", f"{total['bytes'] / 1024:.1f}"]
+            )
+        for source, count in profile["lookups"].items():
+            rows.append([f"summaries from {source}", count, ""])
+        rows.append(["wall time", "", f"{profile['wall_seconds']:.3f}"])
+        return tabulate(
+            rows,
+            headers=["Phase", "Count", "Seconds"],
+            tablefmt="pretty",
+            colalign=("left", "right", "right"),
+        )
+
+    def write(
+        self,
+        filepath: str,
+    ):
+        with open(filepath, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
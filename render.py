@@ -0,0 +1,105 @@
+"""HTML rendering of the reports straight from the result counters."""
+import numpy as np
+from html import escape
+from results import (
+    SEVERITY_COLOURS,
+    BuildResults,
+    format_MRs,
+)
+
+# included once at the top of a HTML report, cells without errors,
+# warnings or results stay in the default colour
+HTML_STYLE = (
+    '<style type="text/css">\n'
+    + "".join(
+        f"table.nightly td.{colour} {{ color: {colour}; }}\n"
+        for colour in SEVERITY_COLOURS
+    )
+    + "</style>\n"
+)
+
+BUILD_SECTION = (
+    "<details><summary>{date}/{build_id}</summary>"
+    'link to <a href="{link}{slot}/{build_id}/">{slot}/{build_id}</a></br>'
+    "{table}</details>"
+)
+
+NO_BUILD_SECTION = (
+    "<details><summary>{date}/(No build)</summary>"
+    "No build available for this day.</details>"
+)
+
+CHANGES_SECTION = (
+    "<details><summary>{date}/{build_id} ({count} changes since "
+    "{previous_id})</summary>"
+    'link to <a href="{link}{slot}/{build_id}/">{slot}/{build_id}</a></br>'
+    "{table}</details>"
+)
+
+NO_PREVIOUS_SECTION = (
+    "<details><summary>{date}/{build_id}</summary>"
+    "No previous build to compare with.</details>"
+)
+
+SLOT_HEADER = "<h4 class='part'>{slot}</h4>\n"
+
+
+def html_table(
+    results: BuildResults,
+) -> str:
+    """Return the table of the build results. Cells are coloured
+    with the classes of HTML_STYLE instead of inline styles."""
+    header = results.header()
+    head = "".join(
+        "<tr><th></th>"
+        + "".join(f"<th>{escape(column[level])}</th>" for column in header)
+        + "</tr>"
+        for level in range(2)
+    )
+    n_projects = len(results.projects)
+    colours = results.colours().astype(object)
+    cells = (
+        np.where(colours == "black", "<td>", '<td class="' + colours + '">')
+        + results.format()
+        + "</td>"
+    )
+    rows = [
+        f"<tr><th>{row}</th>"
+        f"<td>{escape(project)}</td>"
+        f"<td>{escape(format_MRs(failed_MRs))}</td>"
+        + "".join(cells[row])
+        + "</tr>"
+        for row, project, failed_MRs in zip(
+            range(n_projects),
+            results.projects,
+            results.failed_MRs,
+        )
+    ]
+    return (
+        '<table class="nightly">'
+        f"<thead>{head}</thead>"
+        f"<tbody>{''.join(rows)}</tbody>"
+        "</table>"
+    )
+
+
+def html_changes(
+    changes: list,
+) -> str:
+    """Return the table of the changed cells with their previous
+    and current values."""
+    rows = "".join(
+        f"<tr><td>{escape(change.project)}</td>"
+        f"<td>{escape(change.platform)}</td>"
+        f"<td>{change.change}</td>"
+        f'<td class="{change.previous_colour}">{change.previous}</td>'
+        f'<td class="{change.colour}">{change.current}</td></tr>'
+        for change in changes
+    )
+    return (
+        '<table class="nightly">'
+        "<thead><tr><th>Project</th><th>Platform</th><th>Change</th>"
+        "<th>Previous</th><th>Current</th></tr></thead>"
+        f"<tbody>{rows}</tbody>"
+        "</table>"
+    )
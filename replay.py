@@ -0,0 +1,101 @@
+"""Record the responses of the nightlies website in a compressed archive
+and serve them again without any network access."""
+import io
+import logging
+import threading
+import warnings
+import zipfile
+from profiling import Profiler
+from transport import Transport
+
+
+class ResponseArchive:
+    """ZIP archive of the contents of the pages and summaries keyed by
+    their URL (without the scheme), opened for reading with mode 'r'
+    or for recording with mode 'w'.
+
+    A URL recorded again replaces the previous response in the replay."""
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = "r",
+    ):
+        self.path = path
+        self._lock = threading.Lock()
+        self._zip = zipfile.ZipFile(
+            path,
+            mode,
+            compression=zipfile.ZIP_DEFLATED,
+        )
+
+    @staticmethod
+    def _name(
+        url: str,
+    ) -> str:
+        return url.split("://", 1)[-1]
+
+    def get(
+        self,
+        url: str,
+    ) -> bytes:
+        """Return the recorded content of the URL, or None."""
+        with self._lock:
+            try:
+                return self._zip.read(self._name(url))
+            except KeyError:
+                return None
+
+    def put(
+        self,
+        url: str,
+        content: bytes,
+    ):
+        with self._lock, warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            self._zip.writestr(self._name(url), content)
+
+    def close(self):
+        with self._lock:
+            self._zip.close()
+
+
+class ReplayTransport(Transport):
+    """Transport answering the requests with the responses of
+    the archive, URLs which were not recorded are not found (404)."""
+
+    def __init__(
+        self,
+        archive: ResponseArchive,
+        profiler: Profiler = None,
+    ):
+        self._archive = archive
+        self._recorder = None
+        self._cache = None
+        self._profiler = profiler or Profiler()
+        self._pages = {}
+
+    def get(
+        self,
+        url: str,
+        **kwargs,
+    ):
+        import requests
+
+        content = self._archive.get(url)
+        response = requests.Response()
+        response.url = url
+        if content is None:
+            logging.debug(f"'{url}' is not in '{self._archive.path}'.")
+            response.status_code = 404
+            content = b""
+        else:
+            response.status_code = 200
+        response.headers["Content-Length"] = str(len(content))
+        response._content = content
+        response.raw = io.BytesIO(content)
+        self._profiler.request(url, len(content), 0.0, response.status_code)
+        return response
+
+    def close(self):
+        pass
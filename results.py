@@ -0,0 +1,253 @@
+import numpy as np
+from enum import IntEnum
+from typing import NamedTuple
+
+
+class Status(IntEnum):
+    OK = 0
+    UNKNOWN = 1
+
+
+# colours of the cells by severity, cells without results are black
+SEVERITY_COLOURS = ("green", "orange", "red")
+
+# counters which regress when they increase
+PROBLEM_COUNTERS = ("errors", "FAIL", "warnings")
+
+
+class Change(NamedTuple):
+    """Cell of a (project, platform) whose severity or counters of errors,
+    failed tests or warnings changed between two builds, change is
+    'regressed' or 'recovered'."""
+
+    project: str
+    platform: str
+    change: str
+    previous: str
+    previous_colour: str
+    current: str
+    colour: str
+
+
+class MergeRequest(NamedTuple):
+    """Merge request which failed to be merged in a project."""
+
+    project: str
+    id: int
+
+    def __str__(self) -> str:
+        return f"!{self.id}"
+
+
+def format_MRs(
+    failed_MRs: list,
+) -> str:
+    """Return the failed merge requests as in the tables, e.g. '!12,!345'."""
+    return ",".join(map(str, failed_MRs))
+
+
+class BuildResults:
+    """Counters of the checked projects and platforms of a build.
+
+    `counts[project, platform, counter]` holds the counters listed in
+    `result_types` and `status[project, platform, check_type]` tells if
+    all the counters of the check type were found in the summary."""
+
+    def __init__(
+        self,
+        result_types: dict,
+        parsed_result_type: dict,
+    ):
+        self.check_types = list(result_types)
+        self.counters = []
+        self._counter_check = []
+        for check_index, check_values in enumerate(result_types.values()):
+            for result_name in check_values.values():
+                self.counters.append(result_name)
+                self._counter_check.append(check_index)
+        self.prefixes = [parsed_result_type[name] for name in self.counters]
+        self.platforms = []
+        self.columns = []
+        self.projects = []
+        self.failed_MRs = []
+        self.counts = np.zeros((0, 0, len(self.counters)), dtype=np.int64)
+        self.status = np.zeros((0, 0, len(self.check_types)), dtype=np.int8)
+
+    @property
+    def empty(self) -> bool:
+        return not self.projects
+
+    def set_platforms(
+        self,
+        platforms: list,
+        columns: list,
+        max_projects: int,
+    ):
+        """Allocate the counters of the platforms (with their column names)
+        for at most max_projects projects."""
+        self.platforms = platforms
+        self.columns = columns
+        self.counts = np.zeros(
+            (max_projects, len(platforms), len(self.counters)),
+            dtype=np.int64,
+        )
+        self.status = np.full(
+            (max_projects, len(platforms), len(self.check_types)),
+            Status.OK,
+            dtype=np.int8,
+        )
+
+    def add_project(
+        self,
+        name: str,
+        failed_MRs: list = (),
+    ) -> int:
+        self.projects.append(name)
+        self.failed_MRs.append(list(failed_MRs))
+        return len(self.projects) - 1
+
+    def counter(
+        self,
+        name: str,
+    ) -> np.ndarray:
+        """Return the (project, platform) values of the counter."""
+        return self.counts[: len(self.projects), :, self.counters.index(name)]
+
+    def known(
+        self,
+        name: str,
+    ) -> np.ndarray:
+        """Return the (project, platform) mask of the known counter values."""
+        check_index = self._counter_check[self.counters.index(name)]
+        return self.status[: len(self.projects), :, check_index] == Status.OK
+
+    def totals(
+        self,
+        name: str,
+    ) -> dict:
+        """Return the non-zero sums of the counter over platforms
+        for each project."""
+        sums = np.where(self.known(name), self.counter(name), 0).sum(axis=1)
+        return {
+            project: int(total)
+            for project, total in zip(self.projects, sums)
+            if total
+        }
+
+    def format(self) -> np.ndarray:
+        """Return the table cells, e.g. 'W:0 E:0 / P:293 F:0'.
+        Strings are kept in object arrays, which are much faster
+        to concatenate than numpy strings."""
+        n_projects = len(self.projects)
+        values = self.counts[:n_projects].astype(str).astype(object)
+        cells = None
+        for check_index in range(len(self.check_types)):
+            text = None
+            for index, prefix in enumerate(self.prefixes):
+                if self._counter_check[index] != check_index:
+                    continue
+                value = prefix + values[:, :, index]
+                text = value if text is None else text + " " + value
+            text = np.where(
+                self.status[:n_projects, :, check_index] == Status.UNKNOWN,
+                "UNKNOWN",
+                text,
+            )
+            cells = text if cells is None else cells + " / " + text
+        return cells
+
+    def severity(self) -> np.ndarray:
+        """Return the severity of each table cell: 2 for errors or failed
+        tests, 1 for warnings, 0 when there are none of them and -1
+        without any known counter."""
+        errors = self.known("errors")
+        failed = self.known("FAIL")
+        green = (errors & (self.counter("errors") == 0)) | (
+            failed & (self.counter("FAIL") == 0)
+        )
+        orange = self.known("warnings") & (self.counter("warnings") > 0)
+        red = (errors & (self.counter("errors") > 0)) | (
+            failed & (self.counter("FAIL") > 0)
+        )
+        return np.select([red, orange, green], [2, 1, 0], -1)
+
+    def colours(self) -> np.ndarray:
+        """Return the colour of each table cell: red for errors or failed
+        tests, orange for warnings, green when there are none of them."""
+        colours = np.array(SEVERITY_COLOURS + ("black",), dtype=object)
+        return colours[self.severity()].astype(str)
+
+    def compare(
+        self,
+        previous: "BuildResults",
+    ) -> list:
+        """Return the Changes of the cells of the projects and platforms
+        found in both builds. A cell regressed if its severity or any of
+        its PROBLEM_COUNTERS increased, otherwise it recovered if any of
+        them decreased. Cells without results in one of the builds
+        are not compared."""
+        prev_rows = {name: row for row, name in enumerate(previous.projects)}
+        prev_cols = {name: col for col, name in enumerate(previous.platforms)}
+        rows = [
+            row for row, name in enumerate(self.projects) if name in prev_rows
+        ]
+        cols = [
+            col for col, name in enumerate(self.platforms) if name in prev_cols
+        ]
+        if not rows or not cols:
+            return []
+        grid = np.ix_(rows, cols)
+        prev_grid = np.ix_(
+            [prev_rows[self.projects[row]] for row in rows],
+            [prev_cols[self.platforms[col]] for col in cols],
+        )
+        severity = self.severity()[grid]
+        prev_severity = previous.severity()[prev_grid]
+        # counters known in both builds which went up or down
+        worse = np.zeros(severity.shape, dtype=bool)
+        better = np.zeros(severity.shape, dtype=bool)
+        for name in PROBLEM_COUNTERS:
+            known = self.known(name)[grid] & previous.known(name)[prev_grid]
+            diff = self.counter(name)[grid] - previous.counter(name)[prev_grid]
+            worse |= known & (diff > 0)
+            better |= known & (diff < 0)
+        regressed = (severity > prev_severity) | (
+            (severity == prev_severity) & worse
+        )
+        changed = np.argwhere(
+            ((severity != prev_severity) | worse | better)
+            & (severity >= 0)
+            & (prev_severity >= 0)
+        )
+        if not len(changed):
+            return []
+        cells = self.format()[grid]
+        prev_cells = previous.format()[prev_grid]
+        return [
+            Change(
+                self.projects[rows[i]],
+                self.platforms[cols[j]],
+                "regressed" if regressed[i, j] else "recovered",
+                prev_cells[i, j],
+                SEVERITY_COLOURS[prev_severity[i, j]],
+                cells[i, j],
+                SEVERITY_COLOURS[severity[i, j]],
+            )
+            for i, j in changed.tolist()
+        ]
+
+    def header(self) -> list:
+        return [("Project", ""), ("Failed MRs", "")] + [
+            (column, "BUILD / TEST") for column in self.columns
+        ]
+
+    def rows(self) -> list:
+        """Return the rows of the table, in the order of header()."""
+        return [
+            [project, format_MRs(failed_MRs)] + cells
+            for project, failed_MRs, cells in zip(
+                self.projects,
+                self.failed_MRs,
+                self.format().tolist(),
+            )
+        ]
@@ -1,6 +1,13 @@
 import logging
 import click
 from status_checker import StatusChecker
+from export import FORMATS
+from cache import SummaryCache
+from history import HistoryStore
+from profiling import Profiler
+from transport import Transport
+from replay import ResponseArchive
+from server import CheckerServer
 from datetime import date as dt
 from datetime import datetime
 
@@ -16,17 +23,49 @@ except ImportError:
 
 @click.group()
 @click.option("--verbosity", default="INFO", help="verbosity of the logger")
-def cli(verbosity):
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="print the time spent in each phase and the requests",
+)
+@click.option(
+    "--profile-output",
+    default="",
+    help="write the profile in JSON to this file",
+)
+@click.pass_context
+def cli(ctx, verbosity, profile, profile_output):
     root = logging.getLogger()
     root.setLevel(verbosity)
+    ctx.obj = Profiler()
+    if profile or profile_output:
 
+        def report_profile():
+            if profile:
+                logging.info("Profile:\n" + ctx.obj.summary())
+            if profile_output:
+                ctx.obj.write(profile_output)
 
-def common(func):
-    func = click.option(
+        ctx.call_on_close(report_profile)
+
+
+def date_option(
+    default: str,
+    help: str = "date of the slot to check",
+):
+    return click.option(
         "--date",
-        default=dt.today().strftime(StatusChecker.date_format),
-        help=f"date of the slot to check (in '{StatusChecker.date_format}')",
-    )(func)
+        default=default,
+        help=f"{help} (in '{StatusChecker.date_format}')",
+    )
+
+
+def common(func):
+    func = date_option(dt.today().strftime(StatusChecker.date_format))(func)
+    return common_options(func)
+
+
+def common_options(func):
     func = click.option(
         "--slots",
         default=cfg.slots_to_check,
@@ -45,24 +84,166 @@ def common(func):
         help="list of project names to check",
         multiple=True,
     )(func)
+    func = click.option(
+        "--concurrency",
+        default=StatusChecker.max_workers,
+        help="maximal number of summaries downloaded at the same time",
+    )(func)
+    func = click.option(
+        "--workers",
+        default=StatusChecker.workers,
+        help=(
+            "number of processes parsing and rendering the tables "
+            "(at most one per CPU)"
+        ),
+    )(func)
+    func = click.option(
+        "--timeout",
+        default=0.0,
+        help="timeout in seconds of a request to the nightlies website",
+    )(func)
+    func = click.option(
+        "--retries",
+        default=Transport.retries,
+        help="number of retries of a failed request",
+    )(func)
+    func = click.option(
+        "--stream",
+        is_flag=True,
+        help="parse the summaries while downloading them (requires ijson)",
+    )(func)
+    func = click.option(
+        "--history-path",
+        default="",
+        help="path to the history of build and test results",
+    )(func)
+    func = click.option(
+        "--no-history",
+        is_flag=True,
+        help="do not record the results in the history",
+    )(func)
+    func = click.option(
+        "--cache-path",
+        default="",
+        help="path to the cache of build summaries",
+    )(func)
+    func = click.option(
+        "--no-cache",
+        is_flag=True,
+        help="do not use the cache of build summaries",
+    )(func)
+    func = click.option(
+        "--refresh",
+        is_flag=True,
+        help="download again the build summaries and update the cache",
+    )(func)
+    func = click.option(
+        "--server",
+        default="",
+        help="URL of a 'serve' instance to ask for the build summaries",
+    )(func)
+    func = click.option(
+        "--record",
+        default="",
+        help="record the responses of the nightlies website in this "
+        "archive, without the cache",
+    )(func)
+    func = click.option(
+        "--replay",
+        default="",
+        help="answer all the requests from this archive, "
+        "without the cache and the history",
+    )(func)
     return func
 
 
-@click.command()
-@common
-def current_status(date, slots, platforms, projects):
-    """Print in the terminal the summary of nightly slots"""
+def make_checker(
+    slots,
+    platforms,
+    projects,
+    concurrency,
+    workers,
+    timeout,
+    retries,
+    stream,
+    cache_path,
+    no_cache,
+    refresh,
+    history_path,
+    no_history,
+    record,
+    replay,
+    server,
+):
+    """Create the checker from the common options."""
+    # every response is recorded and a replay does not depend
+    # on anything else than the archive, so the cache is not used
+    cache = None
+    if not no_cache and not record and not replay:
+        cache = SummaryCache(path=cache_path, refresh=refresh)
+    history = None
+    if not no_history and not replay:
+        history = HistoryStore(path=history_path)
+    ctx = click.get_current_context()
+    recorder = None
+    if record:
+        recorder = ResponseArchive(record, mode="w")
+        ctx.call_on_close(recorder.close)
+    archive = None
+    if replay:
+        archive = ResponseArchive(replay)
+        ctx.call_on_close(archive.close)
     checker = StatusChecker(
         slot_names=slots,
         platform_names=platforms,
         project_names=projects,
+        max_workers=concurrency,
+        workers=workers,
+        cache=cache,
+        timeout=timeout,
+        retries=retries,
+        stream=stream,
+        history=history,
+        profiler=ctx.find_object(Profiler),
+        record=recorder,
+        replay=archive,
     )
-    checker.check_status(
-        date_to_check=datetime.strptime(
-            date,
-            StatusChecker.date_format,
-        ),
-    )
+    if server:
+        # the builds are still linked to the nightlies website
+        checker.main_page = f"{server.rstrip('/')}/nightly/"
+        checker.api_page = f"{server.rstrip('/')}/api/v1/nightly"
+    return checker
+
+
+def output_format(func):
+    return click.option(
+        "--format",
+        "fmt",
+        default="text",
+        type=click.Choice(("text",) + FORMATS),
+        help="write the tables as text (or HTML) or one row per platform",
+    )(func)
+
+
+@click.command()
+@common
+@output_format
+@click.option(
+    "--filepath",
+    default="",
+    help="path to a file",
+)
+def current_status(date, fmt, filepath, **options):
+    """Print in the terminal the summary of nightly slots"""
+    if fmt == "parquet" and not filepath:
+        # rejected before any build is downloaded
+        raise click.UsageError("Parquet files require --filepath.")
+    checker = make_checker(**options)
+    date_to_check = datetime.strptime(date, StatusChecker.date_format)
+    if fmt != "text":
+        checker.export(date_to_check=date_to_check, fmt=fmt, filepath=filepath)
+        return
+    checker.check_status(date_to_check=date_to_check, filepath=filepath)
 
 
 @click.command()
@@ -77,40 +258,172 @@ def current_status(date, slots, platforms, projects):
     default=True,
     help="write in HTML format",
 )
+@click.option(
+    "--changes-only",
+    is_flag=True,
+    help="show only the cells which regressed or recovered since "
+    "the previous build (text and HTML only)",
+)
+@output_format
 @click.option(
     "--filepath",
-    default="output.html",
-    help="path to a file",
+    default="",
+    help="path to a file (output.html or output.<format> by default)",
 )
 def dqcs_report(
     date,
-    slots,
-    platforms,
-    projects,
     days,
     html,
+    changes_only,
+    fmt,
     filepath,
+    **options,
 ):
     """Prepare the DQCS report."""
-    checker = StatusChecker(
-        slot_names=slots,
-        platform_names=platforms,
-        project_names=projects,
-    )
+    checker = make_checker(**options)
+    date_to_check = datetime.strptime(date, StatusChecker.date_format)
+    if fmt != "text":
+        checker.export(
+            date_to_check=date_to_check,
+            days=days,
+            fmt=fmt,
+            filepath=filepath or f"output.{fmt}",
+        )
+        return
     checker.check_status(
-        date_to_check=datetime.strptime(
-            date,
-            StatusChecker.date_format,
-        ),
+        date_to_check=date_to_check,
+        days=days,
+        html=html,
+        filepath=filepath or "output.html",
+        changes_only=changes_only,
+    )
+
+
+@click.command()
+@date_option(
+    None,
+    help="last day of the report, the current day by default, "
+    "which the report follows",
+)
+@common_options
+@click.option(
+    "--interval",
+    default=300,
+    help="number of seconds between two checks of the nightlies",
+)
+@click.option(
+    "--days",
+    default=1,
+    help="number of days to include in the report",
+)
+@click.option(
+    "--html",
+    default=False,
+    help="write in HTML format",
+)
+@click.option(
+    "--filepath",
+    default="",
+    help="path to a file",
+)
+def watch(
+    date,
+    interval,
+    days,
+    html,
+    filepath,
+    **options,
+):
+    """Check the nightly slots periodically and report the changes."""
+    checker = make_checker(**options)
+    # without a date, follow the current day
+    date_to_check = None
+    if date:
+        date_to_check = datetime.strptime(date, StatusChecker.date_format)
+    checker.watch(
+        interval=interval,
+        date_to_check=date_to_check,
         days=days,
         html=html,
         filepath=filepath,
     )
 
 
+@click.command()
+@click.option(
+    "--project",
+    required=True,
+    help="name of the project",
+)
+@click.option(
+    "--platform",
+    default="",
+    help="part of the platform names to include, e.g. 'el9-gcc13'",
+)
+@click.option(
+    "--slots",
+    default=(),
+    help="list of nightly slot names to include (all by default)",
+    multiple=True,
+)
+@click.option(
+    "--days",
+    default=90,
+    help="number of days to include",
+)
+@click.option(
+    "--date",
+    default=dt.today().strftime(StatusChecker.date_format),
+    help=f"last day to include (in '{StatusChecker.date_format}')",
+)
+@click.option(
+    "--history-path",
+    default="",
+    help="path to the history of build and test results",
+)
+def trends(project, platform, slots, days, date, history_path):
+    """Print the recorded results of a project without accessing
+    the nightlies website."""
+    rows = HistoryStore(path=history_path).trends(
+        project,
+        platform=platform,
+        slots=slots,
+        days=days,
+        until=datetime.strptime(date, StatusChecker.date_format).date(),
+    )
+    if not rows:
+        logging.warning(f"No recorded results of '{project}' were found.")
+        return
+    from tabulate import tabulate
+
+    logging.info(
+        "\n"
+        + tabulate(
+            rows,
+            headers=[
+                "Date",
+                "Slot",
+                "Build",
+                "Platform",
+                "Warnings",
+                "Errors",
+                "Passed",
+                "Failed",
+            ],
+            tablefmt="pretty",
+        )
+    )
+
+
 @click.command()
 @common
-def mkconfig(date, slots, platforms, projects):
+@click.option(
+    "--builds",
+    default=1,
+    help="number of last builds of each slot in which to look "
+    "for platforms and projects",
+)
+def mkconfig(date, builds, **options):
     """Generate config.py to customize
     selection of slots, platforms and projects."""
     cfg_code = """
@@ -129,13 +442,7 @@ platforms_to_check = [
 ]
 """
     pretty_sep = ",\n    "
-    project_list = []
-    platform_list = []
-    checker = StatusChecker(
-        slot_names=slots,
-        platform_names=platforms,
-        project_names=projects,
-    )
+    checker = make_checker(**options)
     slots_list = [sn for sn in checker._slots.keys()]
     miss_slots = [
         sn for sn in StatusChecker.slots_to_check if sn not in slots_list
@@ -145,10 +452,7 @@ platforms_to_check = [
             "Hardcoded default slots {} not found in Nightly page."
             " Maybe update package!".format(", ".join(miss_slots))
         )
-    for slot, build in checker._slots.items():
-        r = checker._get_Platforms_Projects_for_slot(slot, build)
-        project_list += [pn for pn in r[1] if pn not in project_list]
-        platform_list += [pn for pn in r[0] if pn not in platform_list]
+    platform_list, project_list = checker.discover(builds)
     slots_str = pretty_sep.join(['"{}"'.format(ss) for ss in slots_list])
     projects_str = pretty_sep.join(['"{}"'.format(ss) for ss in project_list])
     platforms_str = pretty_sep.join(
@@ -169,9 +473,49 @@ platforms_to_check = [
     )
 
 
+@click.command()
+@common
+@click.option(
+    "--host",
+    default="127.0.0.1",
+    help="address on which to serve",
+)
+@click.option(
+    "--port",
+    default=8080,
+    help="port on which to serve",
+)
+@click.option(
+    "--ttl",
+    default=CheckerServer.ttl,
+    help="seconds after which the main page and the builds that can "
+    "still change are fetched again",
+)
+@click.option(
+    "--keep-days",
+    default=CheckerServer.keep_days,
+    help="number of days, up to today, whose builds are kept in memory",
+)
+def serve(date, host, port, ttl, keep_days, stream, **options):
+    """Share the summaries and reports of one checker over HTTP."""
+    if stream:
+        logging.warning("Streamed summaries cannot be served, ignoring it.")
+    checker = make_checker(stream=False, **options)
+    CheckerServer(
+        checker,
+        host=host,
+        port=port,
+        ttl=ttl,
+        keep_days=keep_days,
+    ).serve_forever()
+
+
 cli.add_command(current_status)
 cli.add_command(dqcs_report)
+cli.add_command(watch)
+cli.add_command(trends)
 cli.add_command(mkconfig)
+cli.add_command(serve)
 
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,209 @@
+"""Local HTTP service sharing one StatusChecker, and so its summaries
+and cache, between several clients.
+
+It serves, in JSON unless noted:
+
+- `/nightly/`: the main nightly page (HTML),
+- `/api/v1/nightly/{slot}/{build_id}/summary`: the build summaries, so that
+  checkers can use the service as their `api_page`,
+- `/results/{slot}/{build_id}`: the parsed results of the build, one row
+  per project and platform as in export.records,
+- `/report?date=...&days=...&html=...&changes_only=...`: the rendered report
+  of the slots of the service, with its errors and failed tests."""
+import json
+import logging
+import threading
+import time
+from datetime import (
+    datetime,
+    timedelta,
+)
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+from urllib.parse import (
+    parse_qs,
+    urlsplit,
+)
+from status_checker import StatusChecker
+
+
+class CheckerServer:
+    # the main page is fetched again and the builds that can still
+    # change are forgotten at most every ttl seconds
+    ttl = 60
+
+    # the builds of that many days, up to today, are kept in memory
+    # from one ttl to the next, older ones are read again from the cache
+    keep_days = 30
+
+    def __init__(
+        self,
+        checker: StatusChecker,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        ttl: float = 0,
+        keep_days: int = 0,
+    ):
+        if ttl:
+            self.ttl = ttl
+        if keep_days:
+            self.keep_days = keep_days
+        self.checker = checker
+        self._lock = threading.Lock()
+        self._checked = None
+        self._page = None
+        # encoded summaries, while the checker keeps the same summary
+        self._encoded = {}
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.url = f"http://{host}:{self.server.server_port}"
+
+    def _expire(self):
+        """Forget the main page, the builds which can still change
+        and the builds of the days before keep_days once they are older
+        than ttl, with their encoded summaries."""
+        with self._lock:
+            now = time.monotonic()
+            if self._checked is not None and now - self._checked < self.ttl:
+                return
+            self._checked = now
+            self._page = None
+            self.checker.forget_unfinished()
+            last_day = self.checker._day()
+            self.checker.forget_outside(
+                last_day - timedelta(days=self.keep_days - 1),
+                last_day,
+            )
+            for key, (parsed, _) in list(self._encoded.items()):
+                if self.checker._summaries.get(key) is not parsed:
+                    del self._encoded[key]
+
+    def main_page(self) -> bytes:
+        self._expire()
+        page = self._page
+        if page is None:
+            page = self.checker._transport.get_page(self.checker.main_page)
+            self._page = page
+        return page
+
+    def summary(
+        self,
+        slot: str,
+        build_id: int,
+    ) -> bytes:
+        self._expire()
+        parsed = self.checker._get_summary(slot, build_id)
+        known = self._encoded.get((slot, build_id))
+        if known and known[0] is parsed:
+            return known[1]
+        encoded = json.dumps(parsed).encode()
+        self._encoded[(slot, build_id)] = (parsed, encoded)
+        return encoded
+
+    def results(
+        self,
+        slot: str,
+        build_id: int,
+    ) -> list:
+        import export
+
+        self._expire()
+        results, build_date, _, _ = self.checker._fetch_build_info(
+            slot,
+            build_id,
+        )
+        build_date = datetime.strptime(build_date, self.checker.date_format)
+        return list(export.records(slot, build_date, build_id, results))
+
+    def report(
+        self,
+        query: dict,
+    ) -> dict:
+        self._expire()
+        stream, errors, failed = self.checker.report(
+            datetime.strptime(
+                query.get("date", datetime.today().strftime("%Y-%m-%d")),
+                self.checker.date_format,
+            ),
+            days=int(query.get("days", 1)),
+            html=query.get("html", "0") in ("1", "true"),
+            changes_only=query.get("changes_only", "0") in ("1", "true"),
+        )
+        return {"report": stream, "errors": errors, "failed": failed}
+
+    def _handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logging.debug(format % args)
+
+            def reply(self, status, body=b"", content_type="text/plain"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                import requests
+
+                url = urlsplit(self.path)
+                parts = url.path.strip("/").split("/")
+                query = {
+                    name: values[-1]
+                    for name, values in parse_qs(url.query).items()
+                }
+                try:
+                    if parts == ["nightly"]:
+                        body = service.main_page()
+                        self.reply(200, body, "text/html")
+                    elif (
+                        len(parts) == 6
+                        and parts[:3] == ["api", "v1", "nightly"]
+                        and parts[4].isdigit()
+                        and parts[5] == "summary"
+                    ):
+                        body = service.summary(parts[3], int(parts[4]))
+                        self.reply(200, body, "application/json")
+                    elif (
+                        len(parts) == 3
+                        and parts[0] == "results"
+                        and parts[2].isdigit()
+                    ):
+                        rows = service.results(parts[1], int(parts[2]))
+                        body = json.dumps(rows).encode()
+                        self.reply(200, body, "application/json")
+                    elif parts == ["report"]:
+                        body = json.dumps(service.report(query)).encode()
+                        self.reply(200, body, "application/json")
+                    else:
+                        self.reply(404)
+                except ValueError as err:
+                    self.reply(400, str(err).encode())
+                except requests.exceptions.HTTPError as err:
+                    # missing builds are missing for the clients too
+                    status = err.response.status_code
+                    self.reply(404 if status == 404 else 502)
+                except requests.exceptions.RequestException as err:
+                    logging.warning(f"Request to '{self.path}' failed: {err}")
+                    self.reply(502)
+
+        return Handler
+
+    def serve_forever(self):
+        logging.info(f"Serving the nightlies on {self.url}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+
+    def start(self):
+        """Serve in a background thread."""
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
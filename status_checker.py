@@ -1,33 +1,207 @@
-import requests
+import os
 import re
 import logging
-import pandas as pd
-from collections import defaultdict
-from utils import (
-    request,
-    color_values,
+import threading
+from collections import (
+    Counter,
+    defaultdict,
+    deque,
 )
-from tabulate import tabulate
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from contextlib import contextmanager
+from utils import request
+from cache import SummaryCache
+from build_index import BuildIndex
+from history import HistoryStore
+from profiling import Profiler
+from transport import Transport
+from replay import (
+    ReplayTransport,
+    ResponseArchive,
+)
+import streaming
+from functools import lru_cache
 from datetime import (
     date,
     datetime,
+    time,
     timedelta,
 )
+from time import sleep
 
 
-def tokenizePlatforms(plist):
-    tree = {}
-    for pp in set(plist):
-        toks = pp.split("-", 3)
-        for i in range(0, 4):
-            tk = "-".join(toks[0:i])
-            if tk in tree:
-                tree[tk].append(pp)
-            else:
-                tree[tk] = [
-                    pp,
+@lru_cache(maxsize=None)
+def shortenPlatforms(plist: tuple) -> tuple:
+    """Return the platform names with the prefix (of up to three tokens)
+    they share with the previous platform replaced by *."""
+    ret = []
+    prev = None
+    for pc in plist:
+        toks = pc.split("-", 3)[:3]
+        if prev is not None:
+            common = 0
+            while common < min(len(toks), len(prev)) and (
+                toks[common] == prev[common]
+            ):
+                common += 1
+            if common:
+                pk = "-".join(toks[:common])
+                ret.append("*" + pc[slice(len(pk), len(pc))])
+                prev = toks
+                continue
+        ret.append(pc)
+        prev = toks
+    return tuple(ret)
+
+
+@lru_cache(maxsize=None)
+def platformColumns(plist: tuple) -> tuple:
+    """Return the short platform names made unique for the tables
+    (add !1, !2, ... to the same names starting with *)."""
+    short_platforms = shortenPlatforms(plist)
+    counts = Counter(short_platforms)
+    seen = Counter()
+    columns = []
+    for pn in short_platforms:
+        if pn.startswith("*") and counts[pn] > 1:
+            seen[pn] += 1
+            pn += f"!{seen[pn]}"
+        columns.append(pn)
+    return tuple(columns)
+
+
+@lru_cache(maxsize=None)
+def mergeRequestPattern(projects: tuple) -> re.Pattern:
+    """Return the pattern of 'Project!123' for any of the projects,
+    capturing the name of the project and the id of the merge request."""
+    names = sorted(projects, key=len, reverse=True)
+    return re.compile(
+        "(" + "|".join(map(re.escape, names)) + r")\!([0-9]{1,5})"
+    )
+
+
+def parseBuildInfo(
+    parsed: dict,
+    projects: tuple,
+    platforms: tuple,
+    result_types: dict,
+    parsed_result_type: dict,
+) -> tuple:
+    """Return (BuildResults, date, errors_totals, failed_totals)
+    of the projects and platforms in the summary of a build."""
+    from results import (
+        BuildResults,
+        MergeRequest,
+        Status,
+    )
+
+    results = BuildResults(result_types, parsed_result_type)
+    if parsed["aborted"]:
+        return results, parsed["date"], {}, {}
+    counter_indices = {
+        check_type: [
+            results.counters.index(result_name)
+            for result_name in check_values.values()
+        ]
+        for check_type, check_values in result_types.items()
+    }
+    # one pattern for all the projects, compiled once
+    mr_pattern = mergeRequestPattern(projects)
+
+    def checkout_warnings(project):
+        checkout = project["checkout"] or {}
+        return checkout.get("warnings") or ()
+
+    for project in parsed["projects"]:
+        if project["name"] in projects and project["enabled"]:
+            if results.empty:
+                long_platforms = [
+                    pn for pn in platforms if pn in project["results"]
                 ]
-    return tree
+                long_platforms.sort(reverse=True)
+                # the column names are computed once per platform set
+                short_platforms = list(platformColumns(tuple(long_platforms)))
+                results.set_platforms(
+                    long_platforms,
+                    short_platforms,
+                    len(parsed["projects"]),
+                )
+            failed_MRs = [
+                MergeRequest(name, int(number))
+                for warn in checkout_warnings(project)
+                for name, number in mr_pattern.findall(warn)
+                if name == project["name"]
+            ]
+            row = results.add_project(project["name"], failed_MRs)
+            for col, platform in enumerate(long_platforms):
+                platform_results = project["results"][platform]
+                for check_index, (check_type, check_values) in enumerate(
+                    result_types.items()
+                ):
+                    try:
+                        results.counts[
+                            row, col, counter_indices[check_type]
+                        ] = [
+                            int(platform_results[check_type][result_name])
+                            for result_name in check_values.values()
+                        ]
+                    except TypeError:
+                        results.status[row, col, check_index] = Status.UNKNOWN
+                    except KeyError:
+                        logging.debug(
+                            f"Missing key [{check_type}] in "
+                            f"{platform_results}. "
+                            "Output will be incomplete"
+                        )
+                        results.status[row, col, check_index] = Status.UNKNOWN
+    return (
+        results,
+        parsed["date"],
+        results.totals("errors"),
+        results.totals("FAIL"),
+    )
+
+
+def renderSection(
+    build_page: str,
+    date_format: str,
+    slot: str,
+    date_back: date,
+    build_id: int,
+    results,
+    html: bool,
+) -> str:
+    """Return the report of the slot for one day, build_id is None
+    without a build. The tables are parsed and rendered by these functions
+    in the worker processes, which get only their arguments."""
+    import render
+
+    parsed_date = date_back.strftime(date_format)
+    if build_id is None:
+        if html:
+            return render.NO_BUILD_SECTION.format(date=parsed_date)
+        return f"-> {slot}/{parsed_date}: No slot available\n"
+    if html:
+        return render.BUILD_SECTION.format(
+            date=parsed_date,
+            build_id=build_id,
+            link=build_page,
+            slot=slot,
+            table=render.html_table(results),
+        )
+    from tabulate import tabulate
+
+    table = tabulate(
+        results.rows(),
+        headers=list(map("\n".join, results.header())),
+        showindex=True,
+        tablefmt="pretty",
+    )
+    return f"-> {slot}/{parsed_date}/{build_id}:\n{table}\n"
 
 
 class StatusChecker:
@@ -86,17 +260,48 @@ class StatusChecker:
 
     api_page = "https://lhcb-nightlies.web.cern.ch/api/v1/nightly"
 
+    # builds are linked to from the HTML reports
+    build_page = "https://lhcb-nightlies.web.cern.ch/nightly/"
+
+    # maximal number of builds checked backward without reaching
+    # an older day, so the limit grows with the number of days
     max_backward_checks = 30
 
-    date_format = "%Y-%m-%d"
+    # the builds following the last known ones are looked for
+    # one by one if the last known ones are at most that many days old,
+    # instead of reading the whole main page
+    max_forward_probes = 3
+
+    # maximal number of summaries downloaded at the same time
+    max_workers = 8
+
+    # processes parsing and rendering the tables, at most one per CPU,
+    # 0 or 1: no processes
+    workers = 0
+
+    # parse the summaries while they are downloaded (requires ijson)
+    stream_summaries = False
+
+    # a build older than that many days is not expected to change anymore
+    final_after_days = 2
 
-    _slots = defaultdict(lambda: 0)
+    date_format = "%Y-%m-%d"
 
     def __init__(
         self,
         slot_names: list = (),
         platform_names: list = (),
         project_names: list = (),
+        max_workers: int = 0,
+        cache: SummaryCache = None,
+        timeout: float = 0,
+        retries: int = -1,
+        stream: bool = False,
+        history: HistoryStore = None,
+        profiler: Profiler = None,
+        workers: int = 0,
+        record: ResponseArchive = None,
+        replay: ResponseArchive = None,
     ):
         if slot_names:
             self.slots_to_check = slot_names
@@ -104,20 +309,122 @@ class StatusChecker:
             self.platforms_to_check = platform_names
         if project_names:
             self.projects_to_check = project_names
-        self.get_current_builds()
-        self._tkPlatforms = tokenizePlatforms(self.platforms_to_check)
-        logging.debug("Tokens " + str(self._tkPlatforms))
+        if max_workers:
+            self.max_workers = max_workers
+        if workers:
+            self.workers = workers
+        if stream and streaming.ijson is None:
+            logging.warning(
+                "Streaming the summaries requires the 'ijson' package, "
+                "falling back to parsing the whole summaries."
+            )
+        elif stream and record:
+            logging.warning(
+                "Streamed summaries cannot be recorded, "
+                "falling back to parsing the whole summaries."
+            )
+        elif stream:
+            self.stream_summaries = True
+        self._summaries = {}
+        self._results = {}
+        # (date, tables or None without results) of the builds fetched
+        # while a report is written section by section, which are kept
+        # instead of their summaries (see _tables_only)
+        self._tables = None
+        # worker processes while a report is written (see _processes),
+        # with the number of summaries which may wait for them
+        self._pool = None
+        self._parsing = None
+        self._stale = {}
+        self._sections = {}
+        # latest build id of each slot, found on first use
+        self._latest = None
+        self._cache = cache
+        self._index = BuildIndex(cache)
+        self._history = history
+        self.profiler = profiler or Profiler()
+        if replay:
+            # all the requests are answered from the archive
+            self._transport = ReplayTransport(replay, profiler=self.profiler)
+        else:
+            self._transport = Transport(
+                pool_size=self.max_workers,
+                timeout=timeout,
+                retries=retries,
+                cache=cache,
+                profiler=self.profiler,
+                recorder=record,
+            )
+
+    @property
+    def _slots(self) -> dict:
+        """Latest build id of each slot, the main page is fetched
+        only when it is needed for the first time."""
+        if self._latest is None:
+            self.get_current_builds()
+        return self._latest
 
     @request
     def get_current_builds(self):
         logging.debug("Fetching the most recent build ids.")
-        response = requests.get(self.main_page)
-        response.raise_for_status()
+        with self.profiler.phase("probes"):
+            latest = self._probe_builds()
+        if latest:
+            self._latest = defaultdict(lambda: 0, latest)
+            logging.debug(f"Found build ids by probing: {latest}.")
+            return
+        self._scrape_builds()
+
+    def _probe_builds(self) -> dict:
+        """Return the latest build id of each slot found by asking for
+        the summaries following the last known builds, or None if
+        a slot has no recent known build or too many new builds."""
+        import requests
+
+        known = {}
+        for slot in self.slots_to_check:
+            build_id, build_date = self._index.latest(slot)
+            if not build_id:
+                return None
+            age = datetime.today() - datetime.strptime(
+                build_date,
+                self.date_format,
+            )
+            if age.days > self.max_forward_probes:
+                return None
+            known[slot] = build_id
+
+        def probe(slot):
+            build_id = known[slot]
+            for _ in range(self.max_forward_probes):
+                try:
+                    self._get_build_date(slot, build_id + 1)
+                except requests.exceptions.HTTPError as err:
+                    if err.response.status_code == 404:
+                        return build_id
+                    raise
+                build_id += 1
+            return None
+
+        try:
+            with ThreadPoolExecutor(
+                max_workers=max(1, min(len(known), self.max_workers))
+            ) as pool:
+                latest = dict(zip(known, pool.map(probe, known)))
+        except requests.exceptions.RequestException as err:
+            logging.debug(f"Probing the builds failed: {err}")
+            return None
+        if None in latest.values():
+            return None
+        return latest
+
+    def _scrape_builds(self):
+        """Find the latest build ids in the links of the main page."""
+        with self.profiler.phase("discovery"):
+            content = self._transport.get_page(self.main_page)
         slots_reg = "|".join(self.slots_to_check)
         slots_reg = rf"(?:{slots_reg})\/[0-9]{{1,4}}\/"
-        slot_candidates = re.findall(
-            slots_reg, response.content.decode("utf-8")
-        )
+        slot_candidates = re.findall(slots_reg, content.decode("utf-8"))
         if not slot_candidates:
             msg = (
                 f"No slots from the list '{self.slots_to_check}' "
@@ -126,47 +433,297 @@ class StatusChecker:
             )
             logging.error(msg)
             raise ValueError(msg)
+        latest = defaultdict(lambda: 0, self._latest or {})
         for slot_candidate in slot_candidates:
             slot, build_id, _ = slot_candidate.split("/")
             build_id = int(build_id)
             # pick only the latest builds
-            if self._slots[slot] < build_id:
-                self._slots[slot] = build_id
-        logging.debug(f"Found build ids: {dict(self._slots)}.")
-
-    def _get_short_platforms(
-        self,
-        plist: [],
-    ) -> []:
-        """Return list of short platform names to check in results.
-        Replace common prefixes by * w.r.t. previous platform considered."""
-        ret = []
-        pp = None
-        for pc in plist:
-            if len(ret) == 0:
-                ret.append(pc)
-                pp = pc
-                continue
-            pk = ""
-            for kk, lst in self._tkPlatforms.items():
-                if pp in lst and pc in lst and len(kk) > len(pk):
-                    pk = kk
-            if len(pk) == 0:
-                ret.append(pc)
+            if latest[slot] < build_id:
+                latest[slot] = build_id
+        # in the order of the slots to check, as the probed builds
+        self._latest = defaultdict(
+            lambda: 0,
+            {
+                slot: latest[slot]
+                for slot in self.slots_to_check
+                if slot in latest
+            },
+        )
+        logging.debug(f"Found build ids: {dict(self._latest)}.")
+
+    def _get_summary(
+        self,
+        slot: str,
+        build_id: int,
+    ) -> dict:
+        """Return the parsed summary of the build, downloading it
+        only if it was not fetched before by this checker
+        and it is not in the on-disk cache. While only the tables are
+        kept, the summary is not kept in memory (see _tables_only)."""
+        key = (slot, build_id)
+        parsed = self._summaries.get(key)
+        if parsed is not None:
+            self.profiler.lookup("memory")
+            return parsed
+        if self._cache:
+            with self.profiler.phase("cache"):
+                parsed = self._cache.get(slot, build_id)
+            if parsed is not None:
+                self.profiler.lookup("cache")
+        if parsed is None:
+            self.profiler.lookup("network")
+            url = f"{self.api_page}/{slot}/{build_id}/summary"
+            if self.stream_summaries:
+                with self._transport.get(url, stream=True) as response:
+                    response.raise_for_status()
+                    response.raw.decode_content = True
+                    with self.profiler.phase("streamed json"):
+                        parsed = streaming.parse_summary(
+                            response.raw,
+                            self.projects_to_check,
+                            self.platforms_to_check,
+                            self.result_types,
+                        )
             else:
-                ss = slice(len(pk), len(pc))
-                ret.append("*" + pc[ss])
-            pp = pc
-        return ret
+                response = self._transport.get(url)
+                response.raise_for_status()
+                with self.profiler.phase("json"):
+                    parsed = response.json()
+            # streamed summaries are incomplete, so they are not shared
+            cached = (
+                self._cache
+                and not self.stream_summaries
+                and self._is_final(parsed)
+            )
+            if cached:
+                self._cache.put(slot, build_id, parsed)
+            if self._history and parsed != self._stale.get(key):
+                with self.profiler.phase("history"):
+                    self._history.record(slot, build_id, parsed)
+        # keep the refreshed summary if it did not change, so that
+        # its results are not parsed and rendered again
+        stale = self._stale.pop(key, None)
+        if stale == parsed:
+            parsed = stale
+        self._index.add(slot, build_id, parsed["date"], parsed["aborted"])
+        if self._tables is None:
+            self._summaries[key] = parsed
+        return parsed
+
+    @contextmanager
+    def _tables_only(self):
+        """Keep the tables of the builds fetched in the block instead of
+        their summaries, so that a long report does not hold the
+        summaries of all its builds in memory."""
+        self._tables = {}
+        try:
+            yield
+        finally:
+            self._tables = None
+
+    @contextmanager
+    def _processes(self):
+        """Parse and render the tables in the worker processes in the
+        block, if there are more than one. The tables of a build are
+        parsed there as soon as its summary is fetched."""
+        # more processes than CPUs only add the cost of sending the tables
+        workers = min(self.workers, os.cpu_count() or 1)
+        if workers < 2 or self._pool is not None:
+            yield
+            return
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            self._pool = pool
+            # at most two summaries per process wait in memory
+            self._parsing = threading.BoundedSemaphore(2 * workers)
+            try:
+                yield
+            finally:
+                self._pool = None
+                self._parsing = None
+
+    def _start_tables(
+        self,
+        parsed: dict,
+    ):
+        """Return the tables of the summary, or the Future of the tables
+        while they are parsed in the worker processes."""
+        if self._pool is None:
+            with self.profiler.phase("tables"):
+                return self._parse_build_info(parsed)
+        parsing = self._parsing
+        parsing.acquire()
+        future = self._pool.submit(parseBuildInfo, parsed, *self._parse_args())
+        future.add_done_callback(lambda _: parsing.release())
+        return future
+
+    def _get_tables(
+        self,
+        slot: str,
+        build_id: int,
+    ) -> tuple:
+        """Return the date and the tables of the build (None without
+        results), which are built once its summary is fetched."""
+        key = (slot, build_id)
+        if key not in self._tables:
+            parsed = self._get_summary(slot, build_id)
+            info = None
+            if self._has_results(parsed):
+                info = self._start_tables(parsed)
+            self._tables[key] = (parsed["date"], info)
+        return self._tables[key]
+
+    def _get_build_date(
+        self,
+        slot: str,
+        build_id: int,
+    ) -> datetime:
+        build_date = self._index.get_date(slot, build_id)
+        if build_date is None and self._tables is not None:
+            build_date = self._get_tables(slot, build_id)[0]
+        elif build_date is None:
+            build_date = self._get_summary(slot, build_id)["date"]
+        return datetime.strptime(build_date, self.date_format)
+
+    def _seek_build(
+        self,
+        slot: str,
+        build_id: int,
+        date_back: date,
+    ) -> int:
+        """Return the most recent build not newer than build_id
+        and not built after date_back.
+
+        The dates of the builds grow with their ids, so instead of
+        checking the builds one by one, the search starts from the builds
+        in the index, jumps by the expected number of builds per day,
+        probes forward from there with doubling steps and bisects only
+        the range where the day ends."""
+        import requests
+
+        try:
+            hi = build_id
+            if self._get_build_date(slot, hi) <= date_back:
+                return hi
+            lo = None
+            known = self._index.known_ids(slot, 1, hi)
+            k_lo, k_hi = 0, len(known)
+            while k_lo < k_hi:
+                k_mid = (k_lo + k_hi) // 2
+                if self._get_build_date(slot, known[k_mid]) <= date_back:
+                    k_lo = k_mid + 1
+                else:
+                    k_hi = k_mid
+            if k_lo > 0:
+                lo = known[k_lo - 1]
+            if k_lo < len(known):
+                hi = known[k_lo]
+            count = 0
+            while lo is None:
+                count += 1
+                # one build per day is expected
+                days_ahead = (self._get_build_date(slot, hi) - date_back).days
+                guess = hi - max(1, days_ahead)
+                if guess < 1 or count > self.max_backward_checks:
+                    return build_id
+                if self._get_build_date(slot, guess) <= date_back:
+                    lo = guess
+                else:
+                    hi = guess
+            # the jump usually lands on the build of the day or just before
+            step = 1
+            while lo + step < hi:
+                if self._get_build_date(slot, lo + step) > date_back:
+                    hi = lo + step
+                    break
+                lo += step
+                step *= 2
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if self._get_build_date(slot, mid) <= date_back:
+                    lo = mid
+                else:
+                    hi = mid
+            return lo
+        except requests.exceptions.HTTPError as err:
+            logging.debug(
+                f"Searching the build of {slot} for {date_back} failed, "
+                f"checking the builds one by one. Error: '{err}'"
+            )
+            return build_id
+
+    def _is_final(
+        self,
+        parsed: dict,
+    ) -> bool:
+        """Tell if the build summary can still change."""
+        if parsed["aborted"]:
+            return True
+        build_date = datetime.strptime(parsed["date"], self.date_format)
+        age = datetime.today() - build_date
+        return age.days >= self.final_after_days
+
+    def _prefetch_summaries(
+        self,
+        pool: ThreadPoolExecutor,
+        slot: str,
+        build_ids: [],
+    ) -> dict:
+        """Download concurrently the summaries of the candidate builds.
+        Return the (date, has_results) of each build, or the error of
+        the builds which failed (after the retries of the transport),
+        they are reported if the build is actually needed."""
+        import requests
+
+        def prefetch(build_id):
+            try:
+                return self._walk_info(slot, build_id)
+            except requests.exceptions.RequestException as err:
+                logging.debug(f"Prefetching '{slot}/{build_id}' failed: {err}")
+                return err
+
+        missing = [
+            build_id
+            for build_id in build_ids
+            if build_id > 0
+            and (slot, build_id) not in self._summaries
+            and (slot, build_id) not in (self._tables or ())
+            and not self._index.is_aborted(slot, build_id)
+        ]
+        return dict(zip(missing, pool.map(prefetch, missing)))
+
+    def _has_results(
+        self,
+        parsed: dict,
+    ) -> bool:
+        """Tell if the build has results of any of the projects to check."""
+        return not parsed["aborted"] and any(
+            project["name"] in self.projects_to_check and project["enabled"]
+            for project in parsed["projects"]
+        )
+
+    def _walk_info(
+        self,
+        slot: str,
+        build_id: int,
+    ) -> (str, bool):
+        """Return what the walk through the builds needs to know about
+        the build: its date and if it has results."""
+        if self._tables is not None:
+            build_date, info = self._get_tables(slot, build_id)
+            return build_date, info is not None
+        parsed = self._get_summary(slot, build_id)
+        has_results = self._has_results(parsed)
+        if has_results and self._pool is not None:
+            # the tables of the builds found are needed next
+            self._build_info(slot, build_id)
+        return parsed["date"], has_results
 
     def _get_Platforms_Projects_for_slot(
         self,
         slot: str,
         build_id: int,
     ) -> ([], []):
-        response = requests.get(f"{self.api_page}/{slot}/{build_id}/summary")
-        response.raise_for_status()
-        parsed = response.json()
+        parsed = self._get_summary(slot, build_id)
         platforms = []
         projects = []
         if parsed["aborted"]:
@@ -179,221 +736,514 @@ class StatusChecker:
             ]
         return platforms, projects
 
+    @request
+    def discover(
+        self,
+        builds: int = 1,
+    ) -> ([], []):
+        """Return the platforms and the enabled projects of the last
+        builds of every slot, in the order of the slots and builds.
+        The summaries are downloaded at the same time."""
+        import requests
+
+        def fetch(key):
+            try:
+                return self._get_Platforms_Projects_for_slot(*key)
+            except requests.exceptions.HTTPError as err:
+                logging.debug(f"Skipping '{key[0]}/{key[1]}': {err}")
+                return [], []
+
+        keys = [
+            (slot, build_id - back)
+            for slot, build_id in self._slots.items()
+            for back in range(builds)
+            if build_id - back > 0
+        ]
+        with self.profiler.phase("discovery"), ThreadPoolExecutor(
+            max_workers=self.max_workers
+        ) as pool:
+            found = list(pool.map(fetch, keys))
+        # dicts keep the first occurrence of each name in order
+        platforms = dict.fromkeys(pn for names, _ in found for pn in names)
+        projects = dict.fromkeys(pn for _, names in found for pn in names)
+        return list(platforms), list(projects)
+
+    def _build_info(
+        self,
+        slot: str,
+        build_id: int,
+    ):
+        """Return the tables of the build, or their Future
+        (see _start_tables)."""
+        if self._tables is not None:
+            return self._get_tables(slot, build_id)[1]
+        parsed = self._get_summary(slot, build_id)
+        # results are parsed again only if the summary was refreshed
+        known = self._results.get((slot, build_id))
+        if known and known[0] is parsed:
+            return known[1]
+        info = self._start_tables(parsed)
+        self._results[(slot, build_id)] = (parsed, info)
+        return info
+
     def _fetch_build_info(
         self,
         slot: str,
         build_id: int,
-        parsed_date: str,
-    ) -> (pd.DataFrame, str):
-        df = pd.DataFrame()
-        response = requests.get(f"{self.api_page}/{slot}/{build_id}/summary")
-        response.raise_for_status()
-        parsed = response.json()
-        if parsed["aborted"]:
-            return df, parsed_date
-        errors_summary = defaultdict(lambda: 0)
-        failed_summary = defaultdict(lambda: 0)
-        long_platforms = []
-        for project in parsed["projects"]:
-            if (
-                project["name"] in self.projects_to_check
-                and project["enabled"]
+    ) -> tuple:
+        info = self._build_info(slot, build_id)
+        if isinstance(info, Future):
+            with self.profiler.phase("tables"):
+                return info.result()
+        return info
+
+    def _parse_build_info(
+        self,
+        parsed: dict,
+    ) -> tuple:
+        """Return (BuildResults, date, errors_totals, failed_totals)."""
+        return parseBuildInfo(parsed, *self._parse_args())
+
+    def _parse_args(self) -> tuple:
+        """Return the arguments of parseBuildInfo after the summary."""
+        return (
+            tuple(self.projects_to_check),
+            tuple(self.platforms_to_check),
+            self.result_types,
+            self.parsed_result_type,
+        )
+
+    def _walk_slot(
+        self,
+        pool: ThreadPoolExecutor,
+        slot: str,
+        build_id: int,
+        date_to_check: date,
+        days: int,
+    ) -> dict:
+        """Find the builds of the slot for each day in one pass backward
+        from the most recent build id, which stops at the first build
+        older than the oldest day. The id of the most recent build with
+        results of each day is kept, the summaries are loaded again
+        when the sections are built."""
+        import requests
+
+        msgs = {}
+        days_by_date = {}
+        for day_delta in range(days):
+            date_back = date_to_check - timedelta(days=day_delta)
+            msgs[date_back] = {}
+            days_by_date[date_back.strftime(self.date_format)] = date_back
+        if not days:
+            return msgs
+        newest = max(days_by_date)
+        oldest = min(days_by_date)
+        try:
+            with self.profiler.phase("build search"):
+                tmp_build_id = self._seek_build(slot, build_id, date_to_check)
+        except (
+            AttributeError,
+            requests.exceptions.RequestException,
+        ) as err:
+            logging.warning(
+                f"Retrieving information for '{slot}/{build_id}' "
+                f" did not work. Error: '{err}'"
+            )
+            return msgs
+        prefetched = tmp_build_id + 1
+        # (date, has_results) or the error of the prefetched builds
+        fetched = {}
+        current = newest
+        # builds checked since the walk reached the day of the last one
+        count = 0
+        while tmp_build_id > 0:
+            count += 1
+            if count > self.max_backward_checks:
+                # the days found so far are still reported
+                logging.error(f"Cannot find {slot} for {current}")
+                break
+            # aborted builds and the dates of the builds are known
+            # without their summaries, once they were seen
+            build_date = self._index.get_date(slot, tmp_build_id)
+            if build_date and build_date < oldest:
+                break
+            if self._index.is_aborted(slot, tmp_build_id) or (
+                build_date
+                and (build_date > newest or msgs[days_by_date[build_date]])
             ):
-                if df.empty:
-                    long_platforms = [
-                        pn
-                        for pn in self.platforms_to_check
-                        if pn in project["results"]
-                    ]
-                    long_platforms.sort(reverse=True)
-                    short_platforms = self._get_short_platforms(long_platforms)
-                    # short_platforms = [
-                    #    # platform.replace(self.hidden_platform_prefix, "*")
-                    #    re.sub(self.hidden_platform_prefix_re, "*", platform)
-                    #    for platform in self.platforms_to_check
-                    #    if platform in project["results"]
-                    # ]
-                    # make short platform names unique for PANDA
-                    # (add +1,+2, ... to same names in list)
-                    ssplatforms = set(short_platforms)
-                    if len(ssplatforms) < len(short_platforms):
-                        for pn in ssplatforms:
-                            if (
-                                not pn.startswith("*")
-                                or short_platforms.count(pn) == 1
-                            ):
-                                continue
-                            pc = 1
-                            while True:
-                                try:
-                                    ip = short_platforms.index(pn)
-                                    short_platforms[ip] += "!{}".format(pc)
-                                    pc += 1
-                                except ValueError:
-                                    break
-                    nested_results_cols = [("Project", ""), ("Failed MRs", "")]
-                    nested_results_cols += [
-                        (platform, "BUILD / TEST")
-                        for platform in short_platforms
-                    ]
-                    df = pd.DataFrame(
-                        columns=pd.MultiIndex.from_tuples(nested_results_cols)
-                    )
-                ptf_res = []
-                # for platform in self.platforms_to_check:
-                for platform in long_platforms:
-                    # if platform not in project["results"]:
-                    #     continue
-                    results = project["results"][platform]
-                    tmp_res = []
-                    for check_type, check_values in self.result_types.items():
-                        tmp_tmp_res = []
-                        for result_name in check_values.values():
-                            try:
-                                counter = int(results[check_type][result_name])
-                                if counter:
-                                    if result_name == "errors":
-                                        errors_summary[
-                                            project["name"]
-                                        ] += counter
-                                    if result_name == "FAIL":
-                                        failed_summary[
-                                            project["name"]
-                                        ] += counter
-                                tmp_tmp_res.append(
-                                    f"{self.parsed_result_type[result_name]}"
-                                    f"{counter}"
-                                )
-                            except TypeError:
-                                tmp_tmp_res = ["UNKNOWN"]
-                                break
-                            except KeyError:
-                                logging.debug(
-                                    f"Missing key [{check_type}]"
-                                    f"[{result_name}] in {results}. "
-                                    "Output will be incomplete"
-                                )
-                                tmp_tmp_res = ["UNKNOWN"]
-                                break
-                        tmp_res.append(" ".join(tmp_tmp_res))
-                    ptf_res.append(" / ".join(tmp_res))
-                failed_MRs = []
-                if project["checkout"] and "warnings" in project["checkout"]:
-                    for warn in project["checkout"]["warnings"]:
-                        tmp_res = re.findall(
-                            rf"{project['name']}\![0-9]{{1,5}}",
-                            warn,
+                tmp_build_id -= 1
+                continue
+            if tmp_build_id < prefetched:
+                # one build per day is expected, so fetch
+                # the candidates for the remaining days at once
+                remaining = (
+                    datetime.strptime(current, self.date_format)
+                    - datetime.strptime(oldest, self.date_format)
+                ).days + 1
+                fetched = self._prefetch_summaries(
+                    pool,
+                    slot,
+                    [
+                        candidate
+                        for candidate in range(
+                            tmp_build_id,
+                            tmp_build_id - remaining,
+                            -1,
                         )
-                        failed_MRs += [
-                            r.replace(project["name"], "") for r in tmp_res
-                        ]
-                df.loc[len(df.index)] = [
-                    project["name"],
-                    ",".join(failed_MRs),
-                    *ptf_res,
-                ]
-        return df, parsed["date"], errors_summary, failed_summary
+                        if (self._index.get_date(slot, candidate) or newest)
+                        >= oldest
+                    ],
+                )
+                prefetched = tmp_build_id - remaining + 1
+            try:
+                info = fetched.pop(tmp_build_id, None)
+                if info is None:
+                    info = self._walk_info(slot, tmp_build_id)
+                if isinstance(info, Exception):
+                    raise info
+                build_date, has_results = info
+            except (
+                AttributeError,
+                requests.exceptions.RequestException,
+            ) as err:
+                logging.warning(
+                    f"Retrieving information for '{slot}/{tmp_build_id}' "
+                    f" did not work. Error: '{err}'"
+                )
+                tmp_build_id -= 1
+                continue
+            if build_date < oldest:
+                break
+            if build_date < current:
+                current = build_date
+                count = 0
+            if (
+                build_date <= newest
+                and not msgs[days_by_date[build_date]]
+                and has_results
+            ):
+                msgs[days_by_date[build_date]] = {"build_id": tmp_build_id}
+                # the previous builds are older than the oldest day
+                if build_date == oldest:
+                    break
+            tmp_build_id -= 1
+        return msgs
 
-    @request
-    def check_status(
+    def _collect(
         self,
-        date_to_check: date = date.today(),
-        days: int = 1,
-        html: bool = False,
-        filepath: str = "",
+        date_to_check: date,
+        days: int,
+    ) -> dict:
+        """Find the builds of all the slots for each day."""
+        msgs = {}
+        slots = list(self._slots.items())
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers
+        ) as pool, ThreadPoolExecutor(
+            max_workers=max(1, min(len(slots), self.max_workers))
+        ) as slot_pool:
+            walks = [
+                slot_pool.submit(
+                    self._walk_slot,
+                    pool,
+                    slot,
+                    build_id,
+                    date_to_check,
+                    days,
+                )
+                for slot, build_id in slots
+            ]
+            # merge in the order of slots to keep the report stable
+            for (slot, _), walk in zip(slots, walks):
+                msgs[slot] = walk.result()
+        return msgs
+
+    def _report_order(
+        self,
+        msgs: dict,
+    ) -> list:
+        """Return (slot, date_back, values) of each section in the order
+        of the report, values are empty without a build."""
+        return [
+            (slot, date_back, m_values[date_back])
+            for slot, m_values in msgs.items()
+            for date_back in sorted(m_values)
+        ]
+
+    def _sections_in_workers(
+        self,
+        msgs: dict,
+        html: bool,
+        workers: int,
+    ):
+        """Render the tables of the builds in the worker processes,
+        which parsed them while the builds were found, so that only their
+        counters are sent to the processes. At most two builds per process
+        are pending, so that the sections do not wait in memory for being
+        written."""
+        pending = deque()
+        for slot, date_back, values in self._report_order(msgs):
+            section = None
+            if values:
+                results, _, errors, failed = self._fetch_build_info(
+                    slot,
+                    values["build_id"],
+                )
+                future = self._pool.submit(
+                    renderSection,
+                    self.build_page,
+                    self.date_format,
+                    slot,
+                    date_back,
+                    values["build_id"],
+                    results,
+                    html,
+                )
+                section = (future, errors, failed)
+            pending.append(section)
+            if len(pending) > 2 * workers:
+                section = pending.popleft()
+                yield section and (section[0].result(),) + section[1:]
+        while pending:
+            section = pending.popleft()
+            yield section and (section[0].result(),) + section[1:]
+
+    def _make_sections(
+        self,
+        msgs: dict,
+        html: bool,
+        keep: bool = True,
+    ):
+        """Yield the report, errors and failed tests of each build
+        (None without a build) in the order of the report, each one is
+        built once it is needed. With keep, the rendered sections are
+        kept for the next reports."""
+        if self._pool is not None:
+            workers = min(self.workers, os.cpu_count() or 1)
+            yield from self._sections_in_workers(msgs, html, workers)
+            return
+        for slot, date_back, values in self._report_order(msgs):
+            if not values:
+                yield None
+                continue
+            results, _, errors, failed = self._fetch_build_info(
+                slot,
+                values["build_id"],
+            )
+            stream = self._render_section(
+                slot,
+                date_back,
+                {"build_id": values["build_id"], "results": results},
+                html,
+                keep,
+            )
+            yield stream, errors, failed
+
+    def _make_changes(
+        self,
+        msgs: dict,
+        html: bool,
     ):
-        msgs = defaultdict(dict)
+        """Yield the changes of each build since the previous build
+        of the slot in the report, with its errors and failed tests,
+        in the order of the report."""
+        # (slot, build_id, results) of the previous build
+        previous = (None, None, None)
+        for slot, date_back, values in self._report_order(msgs):
+            if not values:
+                yield None
+                continue
+            results, _, errors, failed = self._fetch_build_info(
+                slot,
+                values["build_id"],
+            )
+            if previous[0] != slot:
+                previous = (slot, None, None)
+            changes = None
+            if previous[2] is not None:
+                changes = results.compare(previous[2])
+            with self.profiler.phase("render html" if html else "render text"):
+                stream = self._render_changes(
+                    slot,
+                    date_back,
+                    values["build_id"],
+                    previous[1],
+                    changes,
+                    html,
+                )
+            previous = (slot, values["build_id"], results)
+            yield stream, errors, failed
+
+    def _render_changes(
+        self,
+        slot: str,
+        date_back: date,
+        build_id: int,
+        previous_id: int,
+        changes: list,
+        html: bool,
+    ) -> str:
+        """Return the changes of the build, changes is None
+        without a previous build."""
+        import render
+
+        parsed_date = date_back.strftime(self.date_format)
+        if html:
+            if changes is None:
+                return render.NO_PREVIOUS_SECTION.format(
+                    date=parsed_date,
+                    build_id=build_id,
+                )
+            return render.CHANGES_SECTION.format(
+                date=parsed_date,
+                build_id=build_id,
+                count=len(changes),
+                previous_id=previous_id,
+                link=self.build_page,
+                slot=slot,
+                table=render.html_changes(changes) if changes else "",
+            )
+        stream = f"-> {slot}/{parsed_date}/{build_id}: "
+        if changes is None:
+            return stream + "No previous build to compare with\n"
+        if not changes:
+            return stream + f"No changes since {previous_id}\n"
+        from tabulate import tabulate
+
+        table = tabulate(
+            [
+                (c.project, c.platform, c.change, c.previous, c.current)
+                for c in changes
+            ],
+            headers=["Project", "Platform", "Change", "Previous", "Current"],
+            tablefmt="pretty",
+        )
+        stream += f"{len(changes)} changes since {previous_id}\n"
+        return stream + f"{table}\n"
+
+    def _render_section(
+        self,
+        slot: str,
+        date_back: date,
+        values: dict,
+        html: bool,
+        keep: bool = True,
+    ) -> str:
+        """Return the report of the slot for one day. Sections are
+        rendered again only if the results of the build changed."""
+        key = (slot, date_back, html)
+        results = values.get("results")
+        if key in self._sections and self._sections[key][0] is results:
+            return self._sections[key][1]
+        with self.profiler.phase("render html" if html else "render text"):
+            stream = self._render_section_now(slot, date_back, values, html)
+        if keep:
+            self._sections[key] = (results, stream)
+        return stream
+
+    def _render_section_now(
+        self,
+        slot: str,
+        date_back: date,
+        values: dict,
+        html: bool,
+    ) -> str:
+        return renderSection(
+            self.build_page,
+            self.date_format,
+            slot,
+            date_back,
+            values.get("build_id"),
+            values.get("results"),
+            html,
+        )
+
+    def _write_report(
+        self,
+        msgs: dict,
+        html: bool,
+        changes_only: bool,
+        write,
+        keep: bool = True,
+    ) -> (dict, dict):
+        """Pass each part of the report to write as soon as it is ready
+        and return the summaries of errors and failed tests."""
+        import render
+
+        if changes_only:
+            sections = self._make_changes(msgs, html)
+        else:
+            sections = self._make_sections(msgs, html, keep)
+        totals = {}
+        if html:
+            write(render.HTML_STYLE)
+        for slot, m_values in msgs.items():
+            if html:
+                write(render.SLOT_HEADER.format(slot=slot))
+            for date_back in sorted(m_values):
+                section = next(sections)
+                if section is None:
+                    write(
+                        self._render_section(slot, date_back, {}, html, keep)
+                    )
+                    continue
+                write(section[0])
+                totals[(slot, date_back)] = section[1:]
         errors_summary = defaultdict(lambda: 0)
         failed_summary = defaultdict(lambda: 0)
-        for slot, build_id in self._slots.items():
-            tmp_build_id = build_id
-            for day_delta in range(days):
-                date_back = date_to_check - timedelta(days=day_delta)
-                parsed_date = date_back.strftime(self.date_format)
-                msgs[slot][date_back] = {}
-                try:
-                    count = 0
-                    while True:
-                        count += 1
-                        if count > self.max_backward_checks:
-                            msg = f"Cannot find {slot} for {parsed_date}"
-                            logging.error(msg)
-                            raise ValueError(msg)
-                        (
-                            df,
-                            retrieved_date,
-                            error_summary_tmp,
-                            failed_summary_tmp,
-                        ) = self._fetch_build_info(
-                            slot,
-                            tmp_build_id,
-                            parsed_date,
-                        )
-                        prdate = datetime.strptime(
-                            retrieved_date,
-                            self.date_format,
-                        )
-                        if df.empty or prdate > date_back:
-                            tmp_build_id -= 1
-                            continue
-                        elif prdate < date_back:
-                            break
-                        else:
-                            msgs[slot][date_back]["build_id"] = tmp_build_id
-                            msgs[slot][date_back]["df"] = df.reset_index(
-                                drop=True
-                            )
-                            for pr, ers in error_summary_tmp.items():
-                                errors_summary[pr] += ers
-                            for pr, frs in failed_summary_tmp.items():
-                                failed_summary[pr] += frs
-                            break
-                except AttributeError as err:
-                    logging.warning(
-                        f"Retrieving information for '{slot}/{build_id}' "
-                        f" did not work. Error: '{err}'"
-                    )
-        stream = ""
+        # the totals are added in the order of the walk through the builds
         for slot, m_values in msgs.items():
-            sorted_m_values = dict(
-                sorted(m_values.items(), key=lambda x: x[0])
-            )
-            if html:
-                stream += f"<h4 class='part'>{slot}</h4>\n"
-            for date_back, values in sorted_m_values.items():
-                parsed_date = date_back.strftime(self.date_format)
-                if values:
-                    if html:
-                        stream += f"<details><summary>{parsed_date}/{values['build_id']}</summary>"  # noqa: E501
-                        stream += f"link to <a href=\"https://lhcb-nightlies.web.cern.ch/nightly/{slot}/{values['build_id']}/\">"  # noqa: E501
-                        stream += f"{slot}/{values['build_id']}</a></br>"
-                        pretty_df = values["df"].style.applymap(color_values)
-                        stream += f"{pretty_df.to_html()}</details>"
-                    else:
-                        stream += (
-                            f"-> {slot}/{parsed_date}/{values['build_id']}:\n"
-                        )
-                        table = tabulate(
-                            values["df"],
-                            headers=list(
-                                map("\n".join, values["df"].columns.tolist())
-                            ),
-                            tablefmt="pretty",
-                        )
-                        stream += f"{table}\n"
-                else:
-                    if html:
-                        stream += f"<details><summary>{parsed_date}/(No build)</summary>"  # noqa: E501
-                        stream += "No build available for this day.</details>"
-                    else:
-                        stream += (
-                            f"-> {slot}/{parsed_date}: No slot available\n"
-                        )
+            for date_back in m_values:
+                errors, failed = totals.get((slot, date_back), ({}, {}))
+                for pr, ers in errors.items():
+                    errors_summary[pr] += ers
+                for pr, frs in failed.items():
+                    failed_summary[pr] += frs
+        return errors_summary, failed_summary
+
+    def report(
+        self,
+        date_to_check: date = None,
+        days: int = 1,
+        html: bool = False,
+        changes_only: bool = False,
+    ) -> (str, dict, dict):
+        """Return the report with the summaries of errors and failed tests
+        of each project. With changes_only, only the cells which regressed
+        or recovered since the previous build in the report are shown.
+        Without date_to_check, the report ends today."""
+        parts = []
+        with self._processes():
+            with self.profiler.phase("collect"):
+                msgs = self._collect(self._day(date_to_check), days)
+            with self.profiler.phase("sections"):
+                summaries = self._write_report(
+                    msgs,
+                    html,
+                    changes_only,
+                    parts.append,
+                )
+        return ("".join(parts),) + summaries
+
+    def _output(
+        self,
+        stream: str,
+        errors_summary: dict,
+        failed_summary: dict,
+        filepath: str,
+    ):
         if filepath:
             with open(filepath, "w") as f:
                 f.write(stream)
         else:
             logging.info(stream)
+        self._warn(errors_summary, failed_summary)
+
+    def _warn(
+        self,
+        errors_summary: dict,
+        failed_summary: dict,
+    ):
         for project, counter in errors_summary.items():
             logging.warning(
                 f" Found in total {counter} ERRORs in "
@@ -406,3 +1256,172 @@ class StatusChecker:
                 f"the project '{project}'. "
                 f"Verify this and report if this is not known."
             )
+
+    @staticmethod
+    def _day(
+        date_to_check: date = None,
+    ) -> datetime:
+        """Return the start of the day to check, today by default,
+        as it is compared with the dates of the builds."""
+        if date_to_check is None:
+            return datetime.combine(date.today(), time())
+        if isinstance(date_to_check, datetime):
+            return date_to_check
+        return datetime.combine(date_to_check, time())
+
+    @request
+    def check_status(
+        self,
+        date_to_check: date = None,
+        days: int = 1,
+        html: bool = False,
+        filepath: str = "",
+        changes_only: bool = False,
+    ):
+        """Write the report section by section, as soon as each one
+        is ready. Only the tables of the builds are kept, not their
+        summaries."""
+        with self._tables_only(), self._processes():
+            with self.profiler.phase("collect"):
+                msgs = self._collect(self._day(date_to_check), days)
+            with self.profiler.phase("sections"):
+                if filepath:
+                    with open(filepath, "w") as f:
+                        summaries = self._write_report(
+                            msgs,
+                            html,
+                            changes_only,
+                            f.write,
+                            keep=False,
+                        )
+                else:
+                    summaries = self._write_report(
+                        msgs,
+                        html,
+                        changes_only,
+                        lambda part: logging.info(part.rstrip("\n")),
+                        keep=False,
+                    )
+        self._warn(*summaries)
+
+    @request
+    def export(
+        self,
+        date_to_check: date = None,
+        days: int = 1,
+        fmt: str = "ndjson",
+        filepath: str = "",
+    ):
+        """Write the results of the builds in one of export.FORMATS,
+        the rows of each build are written once its table is built.
+        Only the tables are kept, as in check_status."""
+        import export
+
+        errors_summary = defaultdict(lambda: 0)
+        failed_summary = defaultdict(lambda: 0)
+
+        def rows():
+            for slot, m_values in msgs.items():
+                for date_back in sorted(m_values):
+                    values = m_values[date_back]
+                    if not values:
+                        continue
+                    results, _, errors, failed = self._fetch_build_info(
+                        slot,
+                        values["build_id"],
+                    )
+                    for pr, ers in errors.items():
+                        errors_summary[pr] += ers
+                    for pr, frs in failed.items():
+                        failed_summary[pr] += frs
+                    yield from export.records(
+                        slot,
+                        date_back,
+                        values["build_id"],
+                        results,
+                    )
+
+        with self._tables_only(), self._processes():
+            with self.profiler.phase("collect"):
+                msgs = self._collect(self._day(date_to_check), days)
+            with self.profiler.phase("export"):
+                export.write(rows(), fmt, filepath)
+        self._warn(errors_summary, failed_summary)
+
+    def forget_unfinished(self):
+        """Forget the summaries of the builds that can still change,
+        the other ones are kept."""
+        for key, parsed in list(self._summaries.items()):
+            if not self._is_final(parsed):
+                self._stale[key] = self._summaries.pop(key)
+
+    def forget_outside(
+        self,
+        first_day: date,
+        last_day: date,
+    ):
+        """Forget the summaries, tables and sections of the builds
+        of other days, so that a long running checker does not keep
+        every build it has ever seen."""
+        first = first_day.strftime(self.date_format)
+        last = last_day.strftime(self.date_format)
+        for summaries in (self._summaries, self._stale):
+            for key, parsed in list(summaries.items()):
+                if not first <= parsed["date"] <= last:
+                    del summaries[key]
+        for key in list(self._results):
+            if key not in self._summaries and key not in self._stale:
+                del self._results[key]
+        for key in list(self._sections):
+            if not first_day <= key[1] <= last_day:
+                del self._sections[key]
+
+    def refresh(self):
+        """Look for new builds and forget the summaries of the builds
+        that can still change."""
+        self.forget_unfinished()
+        self.get_current_builds()
+
+    @request
+    def watch(
+        self,
+        interval: float = 300,
+        date_to_check: date = None,
+        days: int = 1,
+        html: bool = False,
+        filepath: str = "",
+        polls: int = 0,
+    ):
+        """Check the slots every interval seconds and output the report
+        each time it changes. Without date_to_check, the report follows
+        the current day. With polls, stop after that many checks.
+        A check which fails is logged and done again after interval."""
+        import requests
+
+        previous = None
+        count = 0
+        while True:
+            count += 1
+            last_day = self._day(date_to_check)
+            try:
+                if count > 1:
+                    self.refresh()
+                current = self.report(last_day, days, html)
+            except requests.exceptions.RequestException as err:
+                logging.warning(
+                    f"Checking the nightly slots failed, trying again "
+                    f"in {interval} seconds. Error: '{err}'"
+                )
+            else:
+                if current != previous:
+                    self._output(*current, filepath)
+                    previous = current
+                else:
+                    logging.debug("No changes in the nightly slots.")
+                self.forget_outside(
+                    last_day - timedelta(days=max(days, 1) - 1),
+                    last_day,
+                )
+            if polls and count >= polls:
+                break
+            sleep(interval)
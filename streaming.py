@@ -0,0 +1,92 @@
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+def _is_wanted(
+    path: list,
+    platforms: set,
+    result_types: dict,
+) -> bool:
+    """Tell if the value at the path in the summary is used
+    by the checker. Array items are represented by 'item' in the path."""
+    depth = len(path)
+    if depth == 1:
+        return path[0] in ("date", "aborted", "platforms", "projects")
+    if path[0] == "platforms":
+        return depth == 2
+    if path[0] != "projects" or depth == 2:
+        return path[0] == "projects"
+    field = path[2]
+    if depth == 3:
+        return field in ("name", "enabled", "checkout", "results")
+    if field == "checkout":
+        return path[3] == "warnings" and depth <= 5
+    if field != "results" or path[3] not in platforms:
+        return False
+    if depth == 4:
+        return True
+    check_type = path[4]
+    if check_type not in result_types:
+        return False
+    return depth == 5 or (
+        depth == 6 and path[5] in result_types[check_type].values()
+    )
+
+
+def parse_summary(
+    stream,
+    projects: list,
+    platforms: list,
+    result_types: dict,
+) -> dict:
+    """Parse the build summary while it is read from the stream,
+    keeping only the fields needed for the selected projects and
+    platforms. Other projects are kept only with their name and status."""
+    platforms = set(platforms)
+    projects = set(projects)
+    root = None
+    path = []
+    stack = []
+    for _, event, value in ijson.parse(stream, use_float=True):
+        if event == "map_key":
+            path[-1] = value
+            continue
+        if event in ("end_map", "end_array"):
+            path.pop()
+            node = stack.pop()
+            if (
+                event == "end_map"
+                and path == ["projects", "item"]
+                and node is not None
+                and node.get("name") not in projects
+            ):
+                node.pop("checkout", None)
+                node.pop("results", None)
+            continue
+        if event == "start_map":
+            node = {}
+        elif event == "start_array":
+            node = []
+        else:
+            node = value
+        if not stack:
+            root = node
+            keep = True
+        else:
+            parent = stack[-1]
+            keep = parent is not None and _is_wanted(
+                path, platforms, result_types
+            )
+            if keep and isinstance(parent, list):
+                parent.append(node)
+            elif keep:
+                parent[path[-1]] = node
+        if event == "start_map":
+            stack.append(node if keep else None)
+            path.append(None)
+        elif event == "start_array":
+            stack.append(node if keep else None)
+            path.append("item")
+    return root
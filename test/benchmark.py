@@ -0,0 +1,180 @@
+"""Benchmarks of the status checker against a local stand-in
+of the nightlies website, at several scales:
+
+    python -m test.benchmark --output bench_output.txt --baseline old.txt
+
+For each scale and phase, the wall time, the number of requests and
+the peak of the traced memory are printed and written as JSON lines."""
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import click
+from click.testing import CliRunner
+from datetime import (
+    date,
+    datetime,
+)
+from tabulate import tabulate
+from test.fake_nightlies import FakeNightlies
+from status_checker import StatusChecker
+import run
+
+SCALES = {
+    "small": dict(n_slots=2, n_platforms=4, n_projects=4),
+    "medium": dict(n_slots=4, n_platforms=8, n_projects=8),
+    "large": dict(n_slots=8, n_platforms=24, n_projects=24),
+}
+
+
+def measure(fake, prepare) -> dict:
+    """Run the function returned by prepare twice: timed, then with
+    the memory traced, as tracing slows down the execution a lot."""
+    func = prepare()
+    hits = len(fake.hits)
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    requests = len(fake.hits) - hits
+    func = prepare()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "seconds": round(seconds, 4),
+        "requests": requests,
+        "peak_mb": round(peak / 2**20, 2),
+    }
+
+
+def benchmark_scale(
+    fake: FakeNightlies,
+    days: int,
+    workdir: str,
+) -> dict:
+    StatusChecker.main_page = fake.main_page_url
+    StatusChecker.api_page = fake.api_page_url
+    date_to_check = datetime.combine(date.today(), datetime.min.time())
+
+    def new_checker(workers=0):
+        return StatusChecker(
+            slot_names=fake.slots,
+            platform_names=fake.platforms,
+            project_names=fake.projects,
+            workers=workers,
+        )
+
+    def discover():
+        checker = new_checker()
+        return checker.get_current_builds
+
+    results = {"get_current_builds": measure(fake, discover)}
+    for name, html, workers in (
+        ("check_status", False, 0),
+        ("check_status_workers", False, 4),
+        ("check_status_html", True, 0),
+        ("check_status_html_workers", True, 4),
+    ):
+
+        def prepare():
+            checker = new_checker(workers)
+            checker.get_current_builds()
+            return lambda: checker.check_status(
+                date_to_check=date_to_check,
+                days=days,
+                html=html,
+                filepath=os.path.join(workdir, "report"),
+            )
+
+        results[name] = measure(fake, prepare)
+
+    def mkconfig():
+        with CliRunner().isolated_filesystem(temp_dir=workdir):
+            outcome = CliRunner().invoke(
+                run.mkconfig,
+                ["--no-cache", "--no-history"]
+                + [arg for slot in fake.slots for arg in ("--slots", slot)],
+            )
+            assert outcome.exit_code == 0, outcome.output
+
+    results["mkconfig"] = measure(fake, lambda: mkconfig)
+
+    def startup():
+        subprocess.run(
+            [sys.executable, "run.py", "--help"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+
+    results["cli_startup"] = measure(fake, lambda: startup)
+    return results
+
+
+@click.command()
+@click.option("--scales", default=",".join(SCALES), help="scales to run")
+@click.option("--days", default=7, help="number of days of the reports")
+@click.option("--latency", default=0.02, help="latency of the stand-in")
+@click.option("--aborted-every", default=5, help="abort every N-th build")
+@click.option(
+    "--output",
+    default="bench_output.txt",
+    help="file to which the results are appended as JSON lines",
+)
+@click.option(
+    "--baseline",
+    default="",
+    help="results of a previous run to compare with",
+)
+def main(scales, days, latency, aborted_every, output, baseline):
+    logging.getLogger().setLevel(logging.ERROR)
+    previous = {}
+    if baseline:
+        with open(baseline) as f:
+            for line in f:
+                record = json.loads(line)
+                previous[(record["scale"], record["phase"])] = record
+    records = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for scale in scales.split(","):
+            fake = FakeNightlies(
+                n_days=days + 3,
+                latency=latency,
+                aborted_every=aborted_every,
+                **SCALES[scale],
+            ).start()
+            try:
+                results = benchmark_scale(fake, days, workdir)
+            finally:
+                fake.stop()
+            for phase, result in results.items():
+                records.append({"scale": scale, "phase": phase, **result})
+    rows = []
+    for record in records:
+        row = [
+            record["scale"],
+            record["phase"],
+            record["seconds"],
+            record["requests"],
+            record["peak_mb"],
+        ]
+        old = previous.get((record["scale"], record["phase"]))
+        if old:
+            row.append(f"{record['seconds'] / max(old['seconds'], 1e-6):.2f}")
+        rows.append(row)
+    headers = ["Scale", "Phase", "Seconds", "Requests", "Peak MB"]
+    if previous:
+        headers.append("Time ratio")
+    print(tabulate(rows, headers=headers, tablefmt="pretty"))
+    with open(output, "a") as f:
+        for record in records:
+            f.write(json.dumps({"time": time.time(), **record}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Local stand-in for the LHCb nightlies website and its API.
+
+It serves the main nightly page with links to all the builds and
+the `/api/v1/nightly/{slot}/{build_id}/summary` JSON of synthetic builds,
+one build per slot and day."""
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import (
+    date,
+    timedelta,
+)
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+
+
+class FakeNightlies:
+    def __init__(
+        self,
+        n_slots: int = 4,
+        n_platforms: int = 8,
+        n_projects: int = 8,
+        n_days: int = 10,
+        latency: float = 0.0,
+        aborted_every: int = 0,
+        end_date: date = None,
+        first_build_id: int = 1000,
+        seed: int = 1,
+    ):
+        """Generate n_days + 1 builds for each slot, the last one built
+        on end_date. Builds with an id divisible by aborted_every are
+        aborted. Every response is delayed by latency seconds."""
+        rnd = random.Random(seed)
+        self.latency = latency
+        # number of the next requests answered with 503
+        self.unavailable = 0
+        self.slots = [f"lhcb-slot{i}" for i in range(n_slots)]
+        self.platforms = []
+        compilers = ["gcc12", "gcc13", "gcc12+detdesc", "gcc13+detdesc"]
+        for i in range(n_platforms):
+            arch = ["x86_64_v2", "armv8.1_a"][i // 16 % 2]
+            os_ = ["el9", "centos7"][i // 8 % 2]
+            build_type = ["opt", "dbg"][i % 2]
+            self.platforms.append(
+                f"{arch}-{os_}-{compilers[i // 2 % 4]}-{build_type}"
+            )
+        self.platforms = list(dict.fromkeys(self.platforms))
+        self.projects = [f"Project{i}" for i in range(n_projects)]
+        end_date = end_date or date.today()
+        self.summaries = {}
+        self.latest = {}
+        self.hits = []
+        for slot in self.slots:
+            build_id = first_build_id
+            for day in range(n_days, -1, -1):
+                build_id += 1
+                self.summaries[(slot, build_id)] = self._summary(
+                    rnd,
+                    slot,
+                    build_id,
+                    end_date - timedelta(days=day),
+                    bool(aborted_every) and build_id % aborted_every == 0,
+                )
+            self.latest[slot] = build_id
+
+    def _summary(
+        self,
+        rnd: random.Random,
+        slot: str,
+        build_id: int,
+        build_date: date,
+        aborted: bool,
+    ) -> dict:
+        projects = []
+        for name in self.projects:
+            results = {}
+            for platform in self.platforms:
+                if rnd.random() < 0.05:
+                    results[platform] = {
+                        "build": {"warnings": None, "errors": None},
+                        "tests": None,
+                    }
+                    continue
+                results[platform] = {
+                    "build": {
+                        "warnings": rnd.choice([0, 0, 3, 12]),
+                        "errors": rnd.choice([0, 0, 0, 1]),
+                        "log": "x" * 200,
+                    },
+                    "tests": {
+                        "PASS": rnd.randint(0, 300),
+                        "FAIL": rnd.choice([0, 0, 0, 2]),
+                        "SKIPPED": 3,
+                    },
+                }
+            warnings = []
+            if rnd.random() < 0.3:
+                warnings.append(
+                    f"failed to merge {name}!{rnd.randint(1, 9999)}"
+                )
+            projects.append(
+                {
+                    "name": name,
+                    "enabled": rnd.random() > 0.05,
+                    "checkout": {"warnings": warnings},
+                    "results": results,
+                }
+            )
+        return {
+            "slot": slot,
+            "build_id": build_id,
+            "date": build_date.strftime("%Y-%m-%d"),
+            "aborted": aborted,
+            "platforms": self.platforms,
+            "projects": projects,
+        }
+
+    def main_page(self) -> str:
+        links = "\n".join(
+            f'<a href="/nightly/{slot}/{build_id}/">{slot}/{build_id}</a>'
+            for slot, build_id in sorted(self.summaries)
+        )
+        return f"<html><body>{links}</body></html>"
+
+    def start(self):
+        """Serve the nightlies in a background thread on a free port."""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                fake.hits.append(self.path)
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if fake.unavailable:
+                    fake.unavailable -= 1
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                parts = self.path.strip("/").split("/")
+                headers = {}
+                if parts == ["nightly"]:
+                    body = fake.main_page().encode()
+                    headers["Content-Type"] = "text/html"
+                    headers["ETag"] = f'"{hashlib.md5(body).hexdigest()}"'
+                    if self.headers.get("If-None-Match") == headers["ETag"]:
+                        self.send_response(304)
+                        self.end_headers()
+                        return
+                elif (
+                    len(parts) == 6
+                    and parts[:3] == ["api", "v1", "nightly"]
+                    and parts[4].isdigit()
+                    and parts[5] == "summary"
+                    and (parts[3], int(parts[4])) in fake.summaries
+                ):
+                    summary = fake.summaries[(parts[3], int(parts[4]))]
+                    body = json.dumps(summary).encode()
+                    headers["Content-Type"] = "application/json"
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                headers["Content-Length"] = str(len(body))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.main_page_url = f"{self.url}/nightly/"
+        self.api_page_url = f"{self.url}/api/v1/nightly"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,40 @@
+from build_index import BuildIndex
+from cache import SummaryCache
+
+
+def test_summary_cache(tmp_path):
+    path = str(tmp_path / "summaries.sqlite")
+    summary = {"date": "2024-03-10", "aborted": False, "projects": []}
+    cache = SummaryCache(path=path)
+    assert cache.get("lhcb-sim11", 1234) is None
+    cache.put("lhcb-sim11", 1234, summary)
+    assert cache.get("lhcb-sim11", 1234) == summary
+    cache.close()
+    # summaries survive between runs unless refreshed
+    assert SummaryCache(path=path).get("lhcb-sim11", 1234) == summary
+    assert (
+        SummaryCache(path=path, refresh=True).get("lhcb-sim11", 1234) is None
+    )
+
+
+def test_summary_cache_eviction(tmp_path):
+    path = str(tmp_path / "summaries.sqlite")
+    cache = SummaryCache(path=path, max_entries=2)
+    for build_id in range(3):
+        cache.put("lhcb-sim11", build_id, {"build_id": build_id})
+    cache.evict()
+    assert cache.get("lhcb-sim11", 0) is None
+    assert cache.get("lhcb-sim11", 2) == {"build_id": 2}
+
+
+def test_build_index(tmp_path):
+    path = str(tmp_path / "summaries.sqlite")
+    index = BuildIndex(SummaryCache(path=path))
+    index.add("lhcb-sim11", 12, "2024-03-10", False)
+    index.add("lhcb-sim11", 10, "2024-03-08", True)
+    assert index.known_ids("lhcb-sim11", 1, 11) == [10]
+    # the index is reloaded from the cache
+    index = BuildIndex(SummaryCache(path=path))
+    assert index.known_ids("lhcb-sim11", 1, 20) == [10, 12]
+    assert index.get_date("lhcb-sim11", 12) == "2024-03-10"
+    assert index.get_date("lhcb-sim11", 11) is None
@@ -0,0 +1,67 @@
+import json
+import pytest
+from datetime import date
+import export
+from results import (
+    BuildResults,
+    MergeRequest,
+    Status,
+)
+from status_checker import StatusChecker
+
+
+@pytest.fixture
+def results():
+    results = BuildResults(
+        StatusChecker.result_types,
+        StatusChecker.parsed_result_type,
+    )
+    results.set_platforms(["x86_64_v2-el9-gcc13-opt"], ["a"], 2)
+    row = results.add_project(
+        "Gauss",
+        [MergeRequest("Gauss", 12), MergeRequest("Gauss", 345)],
+    )
+    results.counts[row, 0] = [5, 0, 10, 2]
+    row = results.add_project("LHCb")
+    results.counts[row, 0] = [1, 1, 0, 0]
+    results.status[row, 0, 1] = Status.UNKNOWN
+    return results
+
+
+def test_records(results):
+    rows = list(export.records("lhcb-sim11", date(2024, 3, 10), 42, results))
+    assert [tuple(row) for row in rows] == [export.COLUMNS] * 2
+    assert rows[0] == {
+        "slot": "lhcb-sim11",
+        "date": "2024-03-10",
+        "build_id": 42,
+        "project": "Gauss",
+        "platform": "x86_64_v2-el9-gcc13-opt",
+        "warnings": 5,
+        "errors": 0,
+        "passed": 10,
+        "failed": 2,
+        "failed_MRs": [12, 345],
+    }
+    assert rows[1]["errors"] == 1
+    assert rows[1]["passed"] is None and rows[1]["failed"] is None
+
+
+@pytest.mark.parametrize("fmt", ["json", "ndjson"])
+def test_write(results, tmp_path, fmt):
+    rows = list(export.records("lhcb-sim11", date(2024, 3, 10), 42, results))
+    filepath = tmp_path / f"output.{fmt}"
+    export.write(iter(rows), fmt, str(filepath))
+    text = filepath.read_text()
+    if fmt == "json":
+        assert json.loads(text) == rows
+    else:
+        assert [json.loads(line) for line in text.splitlines()] == rows
+
+
+def test_write_parquet(results, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    rows = list(export.records("lhcb-sim11", date(2024, 3, 10), 42, results))
+    filepath = tmp_path / "output.parquet"
+    export.write(iter(rows), "parquet", str(filepath))
+    assert pq.read_table(filepath).to_pylist() == rows
@@ -0,0 +1,62 @@
+from datetime import date
+from history import HistoryStore
+
+
+def test_history_trends(tmp_path):
+    history = HistoryStore(path=str(tmp_path / "history.sqlite"))
+    for build_id, day in ((10, 8), (11, 9), (12, 10)):
+        history.record(
+            "lhcb-sim11",
+            build_id,
+            {
+                "date": f"2024-03-{day:02}",
+                "aborted": False,
+                "projects": [
+                    {
+                        "name": "Gauss",
+                        "enabled": True,
+                        "results": {
+                            "x86_64_v2-el9-gcc13-opt": {
+                                "build": {"warnings": 1, "errors": 0},
+                                "tests": {"PASS": 5, "FAIL": build_id},
+                            },
+                            "x86_64_v2-el9-gcc13-dbg": {
+                                "build": {"warnings": None, "errors": None},
+                                "tests": None,
+                            },
+                        },
+                    },
+                ],
+            },
+        )
+    rows = history.trends(
+        "Gauss",
+        platform="el9-gcc13-opt",
+        days=2,
+        until=date(2024, 3, 10),
+    )
+    assert rows == [
+        (
+            "2024-03-09",
+            "lhcb-sim11",
+            11,
+            "x86_64_v2-el9-gcc13-opt",
+            1,
+            0,
+            5,
+            11,
+        ),
+        (
+            "2024-03-10",
+            "lhcb-sim11",
+            12,
+            "x86_64_v2-el9-gcc13-opt",
+            1,
+            0,
+            5,
+            12,
+        ),
+    ]
+    rows = history.trends("Gauss", platform="dbg", until=date(2024, 3, 10))
+    assert [row[4:] for row in rows] == [(None,) * 4] * 3
+    assert history.trends("Gauss", slots=["lhcb-sim10"]) == []
@@ -0,0 +1,632 @@
+import json
+import os
+import re
+import pytest
+from datetime import (
+    date,
+    datetime,
+    timedelta,
+)
+from test.fake_nightlies import FakeNightlies
+from cache import SummaryCache
+from profiling import Profiler
+from replay import ResponseArchive
+from status_checker import StatusChecker
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeNightlies(
+        n_slots=2,
+        n_days=6,
+        aborted_every=4,
+        end_date=date(2024, 3, 10),
+    ).start()
+    monkeypatch.setattr(StatusChecker, "main_page", fake.main_page_url)
+    monkeypatch.setattr(StatusChecker, "api_page", fake.api_page_url)
+    yield fake
+    fake.stop()
+
+
+def make_checker(fake, **kwargs):
+    return StatusChecker(
+        slot_names=fake.slots,
+        platform_names=fake.platforms,
+        project_names=fake.projects,
+        **kwargs,
+    )
+
+
+def test_check_status(fake, tmp_path):
+    checker = make_checker(fake)
+    # the main page is fetched only when the builds are needed
+    assert fake.hits == []
+    assert dict(checker._slots) == fake.latest
+    filepath = tmp_path / "report.txt"
+    checker.check_status(
+        date_to_check=datetime(2024, 3, 10),
+        days=5,
+        filepath=str(filepath),
+    )
+    report = filepath.read_text()
+    # builds 1004 of both slots, from 2024-03-07, are aborted
+    assert "-> lhcb-slot0/2024-03-07: No slot available" in report
+    assert "-> lhcb-slot1/2024-03-06/1003:" in report
+    assert "-> lhcb-slot1/2024-03-10/1007:" in report
+    assert len(re.findall(r"^-> .*/[0-9]+:$", report, re.MULTILINE)) == 8
+    # every build is downloaded at most once
+    summaries = [hit for hit in fake.hits if hit.endswith("/summary")]
+    assert len(summaries) == len(set(summaries)) == 2 * 5
+    # only the tables were kept during the report, nothing after it
+    assert not checker._summaries
+    assert not checker._results
+    assert not checker._sections
+    assert checker._tables is None
+
+
+def test_check_status_tables(fake, tmp_path, monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    date_to_check = datetime(2024, 3, 10)
+    expected = make_checker(fake).report(date_to_check, days=5, html=True)
+    cache = SummaryCache(path=str(tmp_path / "cache.sqlite"))
+    for kwargs in ({}, {"cache": cache}, {"workers": 2}):
+        checker = make_checker(fake, **kwargs)
+        loaded = []
+        parse_build_info = checker._parse_build_info
+
+        def parse(parsed):
+            # the summaries are parsed once, when they are fetched
+            loaded.append(parsed["build_id"])
+            return parse_build_info(parsed)
+
+        checker._parse_build_info = parse
+        hits = len(fake.hits)
+        filepath = tmp_path / "report.html"
+        checker.check_status(
+            date_to_check,
+            days=5,
+            html=True,
+            filepath=str(filepath),
+        )
+        assert filepath.read_text() == expected[0]
+        summaries = [hit for hit in fake.hits[hits:] if "/summary" in hit]
+        assert len(summaries) == len(set(summaries))
+        assert not checker._summaries and not checker._results
+        if not kwargs.get("workers"):
+            assert len(loaded) == 2 * 4
+
+
+def test_check_status_html(fake, tmp_path):
+    filepath = tmp_path / "report.html"
+    make_checker(fake, max_workers=1).check_status(
+        date_to_check=datetime(2024, 3, 10),
+        days=2,
+        html=True,
+        filepath=str(filepath),
+    )
+    report = filepath.read_text()
+    assert report.count("<h4 class='part'>") == 2
+    assert "<summary>2024-03-09/1006</summary>" in report
+    assert "/lhcb-slot1/1007/" in report
+
+
+def test_check_status_workers(fake, monkeypatch):
+    # the processes are used even on a single CPU
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    date_to_check = datetime(2024, 3, 10)
+    expected = make_checker(fake).report(date_to_check, days=5)
+    checker = make_checker(fake, workers=2)
+    sections_in_workers = checker._sections_in_workers
+    used = []
+
+    def in_workers(msgs, html, workers):
+        used.append(workers)
+        return sections_in_workers(msgs, html, workers)
+
+    checker._sections_in_workers = in_workers
+    # the tables are parsed in the processes too
+    checker._parse_build_info = None
+    reports = checker.report(date_to_check, days=5)
+    assert used == [2]
+    assert reports[0] == expected[0]
+    assert list(reports[1].items()) == list(expected[1].items())
+    assert list(reports[2].items()) == list(expected[2].items())
+    assert checker._pool is None
+
+
+def test_profiler(fake, tmp_path):
+    cache = SummaryCache(path=str(tmp_path / "cache.sqlite"))
+    profiler = Profiler()
+    checker = make_checker(fake, profiler=profiler, cache=cache)
+    checker.report(datetime(2024, 3, 10), days=2)
+    profile = profiler.to_dict()
+    for name in ("discovery", "collect", "json", "tables", "render text"):
+        assert profile["phases"][name]["count"] > 0
+    assert profile["phases"]["collect"]["count"] == 1
+    assert profile["requests_total"]["count"] == len(fake.hits) == 1 + 2 * 2
+    assert profile["requests_total"]["bytes"] == sum(
+        request["bytes"] for request in profile["requests"]
+    )
+    assert {request["status"] for request in profile["requests"]} == {200}
+    assert profile["lookups"]["network"] == 2 * 2
+    assert "cache" not in profile["lookups"]
+    # the finished builds are read from the cache by the next checker
+    profiler = Profiler()
+    make_checker(fake, profiler=profiler, cache=cache).report(
+        datetime(2024, 3, 10),
+        days=2,
+    )
+    assert profiler.lookups["cache"] == 2 * 2
+    assert "network" not in profiler.lookups
+    assert profiler.phases["cache"][0] > 0
+
+
+def test_export(fake, tmp_path):
+    filepath = tmp_path / "report.ndjson"
+    make_checker(fake).export(
+        date_to_check=datetime(2024, 3, 10),
+        days=2,
+        fmt="ndjson",
+        filepath=str(filepath),
+    )
+    rows = [json.loads(line) for line in filepath.read_text().splitlines()]
+    assert {(row["slot"], row["date"]) for row in rows} == {
+        ("lhcb-slot0", "2024-03-09"),
+        ("lhcb-slot0", "2024-03-10"),
+        ("lhcb-slot1", "2024-03-09"),
+        ("lhcb-slot1", "2024-03-10"),
+    }
+    assert {row["build_id"] for row in rows} == {1006, 1007}
+
+
+def add_build(fake, slot):
+    """Publish a new build of the slot, a copy of the latest one."""
+    fake.summaries[(slot, fake.latest[slot] + 1)] = fake.summaries[
+        (slot, fake.latest[slot])
+    ]
+    fake.latest[slot] += 1
+
+
+def test_probe_builds(monkeypatch, tmp_path):
+    fake = FakeNightlies(n_slots=2, n_days=3).start()
+    monkeypatch.setattr(StatusChecker, "main_page", fake.main_page_url)
+    monkeypatch.setattr(StatusChecker, "api_page", fake.api_page_url)
+    cache = SummaryCache(path=str(tmp_path / "cache.sqlite"))
+    try:
+        make_checker(fake, cache=cache).report(datetime.today(), days=2)
+        assert fake.hits.count("/nightly/") == 1
+        # the builds following the known ones are probed
+        add_build(fake, fake.slots[0])
+        assert dict(make_checker(fake, cache=cache)._slots) == fake.latest
+        assert fake.hits.count("/nightly/") == 1
+        # too many new builds, the main page is read again
+        add_build(fake, fake.slots[0])
+        add_build(fake, fake.slots[0])
+        checker = make_checker(fake, cache=cache)
+        checker.max_forward_probes = 1
+        assert dict(checker._slots) == fake.latest
+        assert fake.hits.count("/nightly/") == 2
+    finally:
+        fake.stop()
+
+
+def test_slots_order(monkeypatch, tmp_path):
+    fake = FakeNightlies(n_slots=3, n_days=2).start()
+    monkeypatch.setattr(StatusChecker, "main_page", fake.main_page_url)
+    monkeypatch.setattr(StatusChecker, "api_page", fake.api_page_url)
+    slots = fake.slots[::-1]
+    cache = SummaryCache(path=str(tmp_path / "cache.sqlite"))
+    try:
+        checker = StatusChecker(slot_names=slots, cache=cache)
+        checker.report(datetime.today(), days=1)
+        assert list(checker._slots) == slots
+        # the builds found by probing are in the same order
+        checker = StatusChecker(slot_names=slots, cache=cache)
+        assert list(checker._slots) == slots
+        assert fake.hits.count("/nightly/") == 1
+    finally:
+        fake.stop()
+
+
+def test_watch(monkeypatch, tmp_path):
+    import status_checker
+
+    fake = FakeNightlies(n_slots=2, n_days=6).start()
+    monkeypatch.setattr(StatusChecker, "main_page", fake.main_page_url)
+    monkeypatch.setattr(StatusChecker, "api_page", fake.api_page_url)
+    # the hits of each poll start after a sleep
+    polls = [0]
+
+    def sleep(interval):
+        polls.append(len(fake.hits))
+        # the second check can read neither the next builds (one probe
+        # per slot) nor the main page
+        if len(polls) == 2:
+            fake.unavailable = len(fake.slots) + 1
+
+    monkeypatch.setattr(status_checker, "sleep", sleep)
+    checker = make_checker(fake, retries=0)
+    # builds of older days, forgotten after the first check
+    checker.report(datetime.today() - timedelta(days=5), days=2)
+    oldest = (date.today() - timedelta(days=3)).strftime("%Y-%m-%d")
+    assert any(
+        parsed["date"] < oldest for parsed in checker._summaries.values()
+    )
+    polls[0] = len(fake.hits)
+    filepath = tmp_path / "report.txt"
+    try:
+        checker.watch(interval=0, days=4, filepath=str(filepath), polls=3)
+    finally:
+        fake.stop()
+    # the check after the failed one is done anyway
+    assert len(polls) == 3
+    today = date.today().strftime("%Y-%m-%d")
+    assert f"-> lhcb-slot0/{today}/{fake.latest['lhcb-slot0']}:" in (
+        filepath.read_text()
+    )
+    # only the builds which can still change are fetched again
+    last = polls[2]
+    again = {
+        hit
+        for hit in fake.hits[last:]
+        if hit.endswith("/summary")
+        and (hit.split("/")[-3], int(hit.split("/")[-2])) in fake.summaries
+    }
+    assert again == {
+        f"/api/v1/nightly/{slot}/{build_id}/summary"
+        for slot, latest in fake.latest.items()
+        for build_id in range(
+            latest - checker.final_after_days + 1, latest + 1
+        )
+    }
+    # only the builds of the days of the report are kept
+    assert checker._summaries
+    assert all(
+        parsed["date"] >= oldest for parsed in checker._summaries.values()
+    )
+    assert set(checker._results) <= set(checker._summaries)
+
+
+def test_skip_aborted_builds(fake, tmp_path):
+    class Cache(SummaryCache):
+        def get(self, slot, build_id):
+            self.loaded.append((slot, build_id))
+            return super().get(slot, build_id)
+
+    cache = Cache(path=str(tmp_path / "cache.sqlite"))
+    cache.loaded = []
+    date_to_check = datetime(2024, 3, 10)
+    expected = make_checker(fake, cache=cache).report(date_to_check, days=5)
+    assert ("lhcb-slot0", 1004) in cache.loaded
+    cache.loaded = []
+    hits = len(fake.hits)
+    report = make_checker(fake, cache=cache).report(date_to_check, days=5)
+    assert report[0] == expected[0]
+    # the aborted builds are known from the index of the builds
+    assert ("lhcb-slot0", 1004) not in cache.loaded
+    assert len(cache.loaded) == 2 * 4
+    assert fake.hits[hits:] == ["/nightly/"]
+
+
+def test_changes_only(fake):
+    date_to_check = datetime(2024, 3, 10)
+    checker = make_checker(fake)
+    full = checker.report(date_to_check, days=3)
+    hits = len(fake.hits)
+    report, errors, failed = checker.report(
+        date_to_check,
+        days=3,
+        changes_only=True,
+    )
+    # the builds of the full report are compared
+    assert len(fake.hits) == hits
+    assert (errors, failed) == full[1:]
+    assert "-> lhcb-slot0/2024-03-08/1005: No previous build" in report
+    assert "-> lhcb-slot0/2024-03-09/1006: " in report
+    first = checker._fetch_build_info("lhcb-slot0", 1006)[0]
+    second = checker._fetch_build_info("lhcb-slot0", 1007)[0]
+    changes = second.compare(first)
+    assert changes
+    assert f"{len(changes)} changes since 1006" in report
+    for change in changes:
+        assert change.change in ("regressed", "recovered")
+        assert change.previous != change.current
+    html = checker.report(date_to_check, days=3, html=True, changes_only=True)
+    assert f"({len(changes)} changes since 1006)" in html[0]
+
+
+def test_discover(fake):
+    fake.summaries[("lhcb-slot1", 1006)]["platforms"] = ["extra-el9-opt"]
+    platforms, projects = make_checker(fake).discover()
+    assert platforms == fake.platforms
+    assert set(projects) <= set(fake.projects)
+    assert fake.hits.count("/nightly/") == 1
+    # the previous builds are scanned too
+    hits = len(fake.hits)
+    platforms, _ = make_checker(fake).discover(builds=2)
+    assert platforms == fake.platforms + ["extra-el9-opt"]
+    assert len(fake.hits) == hits + 1 + 2 * 2
+
+
+def test_record_replay(fake, tmp_path):
+    date_to_check = datetime(2024, 3, 10)
+    archive = ResponseArchive(str(tmp_path / "nightlies.zip"), mode="w")
+    expected = make_checker(fake, record=archive).report(
+        date_to_check,
+        days=5,
+    )
+    archive.close()
+    hits = len(fake.hits)
+    archive = ResponseArchive(str(tmp_path / "nightlies.zip"))
+    for stream in (False, True):
+        checker = make_checker(fake, replay=archive, stream=stream)
+        assert checker.report(date_to_check, days=5) == expected
+    assert len(fake.hits) == hits
+
+
+def test_streamed_report(fake, tmp_path):
+    date_to_check = datetime(2024, 3, 10)
+    expected = make_checker(fake).report(date_to_check, days=5)
+    checker = make_checker(fake)
+    events = []
+    fetch_build_info = checker._fetch_build_info
+
+    def fetch(slot, build_id):
+        events.append("build")
+        return fetch_build_info(slot, build_id)
+
+    checker._fetch_build_info = fetch
+    msgs = checker._collect(date_to_check, days=5)
+    checker._write_report(
+        msgs,
+        False,
+        False,
+        lambda part: events.append("write"),
+        keep=False,
+    )
+    # each section is written before the next build is parsed
+    assert "build build" not in " ".join(events)
+    assert events.count("write") == 2 * 5
+    filepath = tmp_path / "report.txt"
+    checker.check_status(date_to_check, days=5, filepath=str(filepath))
+    assert filepath.read_text() == expected[0]
+    # only the sections without builds are kept
+    assert all(results is None for results, _ in checker._sections.values())
+
+
+def test_async_checker(fake):
+    import asyncio
+    from async_checker import AsyncStatusChecker
+
+    date_to_check = datetime(2024, 3, 10)
+    expected = make_checker(fake).report(date_to_check, days=5)
+    hits = len(fake.hits)
+
+    async def check():
+        async with AsyncStatusChecker(
+            slot_names=fake.slots,
+            platform_names=fake.platforms,
+            project_names=fake.projects,
+            max_workers=4,
+        ) as checker:
+            # the event loop keeps running during the requests
+            ticks = []
+
+            async def tick():
+                while True:
+                    ticks.append(None)
+                    await asyncio.sleep(0)
+
+            ticker = asyncio.ensure_future(tick())
+            latest = await checker.get_current_builds()
+            report = await checker.report(date_to_check, days=5)
+            ticker.cancel()
+            return latest, report, ticks
+
+    latest, report, ticks = asyncio.run(check())
+    assert latest == fake.latest
+    assert report == expected
+    assert len(fake.hits) - hits == 1 + 2 * 5
+    assert len(ticks) > 1
+
+
+def test_report_defaults(monkeypatch, tmp_path):
+    fake = FakeNightlies(n_slots=1, n_days=1).start()
+    monkeypatch.setattr(StatusChecker, "main_page", fake.main_page_url)
+    monkeypatch.setattr(StatusChecker, "api_page", fake.api_page_url)
+    filepath = tmp_path / "report.txt"
+    try:
+        checker = make_checker(fake)
+        report, _, _ = checker.report()
+        checker.check_status(filepath=str(filepath))
+        checker.export(filepath=str(tmp_path / "report.ndjson"))
+    finally:
+        fake.stop()
+    # the reports of today
+    today = date.today().strftime("%Y-%m-%d")
+    expected = f"-> lhcb-slot0/{today}/{fake.latest['lhcb-slot0']}:"
+    assert expected in report
+    assert expected in filepath.read_text()
+    rows = (tmp_path / "report.ndjson").read_text().splitlines()
+    assert {json.loads(row)["date"] for row in rows} == {today}
+
+
+def test_async_checker_defaults(monkeypatch):
+    import asyncio
+    from async_checker import AsyncStatusChecker
+
+    fake = FakeNightlies(n_slots=1, n_days=1).start()
+    monkeypatch.setattr(StatusChecker, "main_page", fake.main_page_url)
+    monkeypatch.setattr(StatusChecker, "api_page", fake.api_page_url)
+
+    async def check():
+        async with AsyncStatusChecker(
+            slot_names=fake.slots,
+            platform_names=fake.platforms,
+            project_names=fake.projects,
+        ) as checker:
+            return await checker.report()
+
+    try:
+        report, _, _ = asyncio.run(check())
+    finally:
+        fake.stop()
+    # the report of today, as in the README
+    today = date.today().strftime("%Y-%m-%d")
+    assert f"-> lhcb-slot0/{today}/{fake.latest['lhcb-slot0']}:" in report
+
+
+def test_server(fake):
+    import requests
+    from server import CheckerServer
+
+    date_to_check = datetime(2024, 3, 10)
+    expected = make_checker(fake).report(date_to_check, days=5)
+    hits = len(fake.hits)
+    # only the builds since 2024-03-08 are kept
+    keep_days = (date.today() - date(2024, 3, 8)).days + 1
+    service = CheckerServer(
+        make_checker(fake),
+        port=0,
+        keep_days=keep_days,
+    ).start()
+    try:
+        for _ in range(2):
+            client = make_checker(fake)
+            client.main_page = f"{service.url}/nightly/"
+            client.api_page = f"{service.url}/api/v1/nightly"
+            assert client.report(date_to_check, days=5) == expected
+        # every build is downloaded once for all the clients
+        summaries = [hit for hit in fake.hits[hits:] if "/summary" in hit]
+        assert len(summaries) == len(set(summaries)) == 2 * 5
+        assert fake.hits[hits:].count("/nightly/") == 1
+        rows = requests.get(f"{service.url}/results/lhcb-slot1/1007").json()
+        assert {row["build_id"] for row in rows} == {1007}
+        assert len(rows) == len(fake.platforms) * len(
+            {row["project"] for row in rows}
+        )
+        report = requests.get(
+            f"{service.url}/report",
+            params={"date": "2024-03-10", "days": 5},
+        ).json()
+        assert report["report"] == expected[0]
+        assert report["errors"] == expected[1]
+        missing = requests.get(
+            f"{service.url}/api/v1/nightly/lhcb-slot0/2000/summary"
+        )
+        assert missing.status_code == 404
+        # the older builds are forgotten with their encoded summaries
+        assert len(service._encoded) == 2 * 5
+        service._checked = None
+        service._expire()
+        checker = service.checker
+        assert {parsed["date"] for parsed in checker._summaries.values()} == {
+            "2024-03-08",
+            "2024-03-09",
+            "2024-03-10",
+        }
+        assert set(service._encoded) == set(checker._summaries)
+        assert set(checker._results) <= set(checker._summaries)
+    finally:
+        service.stop()
+
+
+def test_walk_once(fake):
+    # a missing build does not stop the walk through the older days
+    del fake.summaries[("lhcb-slot0", 1005)]
+    checker = make_checker(fake)
+    msgs = checker._collect(datetime(2024, 3, 10), days=6)
+    assert {
+        day.day: values.get("build_id")
+        for day, values in msgs["lhcb-slot0"].items()
+    } == {10: 1007, 9: 1006, 8: None, 7: None, 6: 1003, 5: 1002}
+    summaries = [hit for hit in fake.hits if hit.endswith("/summary")]
+    assert len(summaries) == len(set(summaries)) == 2 * 6
+
+
+def test_walk_too_many_builds(fake):
+    # three builds of the same day, the slot keeps the days found so far
+    for build_id in (1005, 1006):
+        fake.summaries[("lhcb-slot0", build_id)] = dict(
+            fake.summaries[("lhcb-slot0", build_id)],
+            date="2024-03-10",
+        )
+    checker = make_checker(fake)
+    checker.max_backward_checks = 2
+    msgs = checker._collect(datetime(2024, 3, 10), days=3)
+    assert {
+        day.day: values.get("build_id")
+        for day, values in msgs["lhcb-slot0"].items()
+    } == {10: 1007, 9: None, 8: None}
+    assert all(msgs["lhcb-slot1"].values())
+
+
+def test_seek_past_build(monkeypatch):
+    fake = FakeNightlies(n_slots=1, n_days=40).start()
+    monkeypatch.setattr(StatusChecker, "api_page", fake.api_page_url)
+    slot = fake.slots[0]
+
+    def seek(days_back):
+        fake.hits.clear()
+        build_id = make_checker(fake)._seek_build(
+            slot,
+            fake.latest[slot],
+            datetime.combine(date.today(), datetime.min.time())
+            - timedelta(days=days_back),
+        )
+        return build_id, [int(hit.split("/")[-2]) for hit in fake.hits]
+
+    try:
+        # the jump lands on the build of the day, the next one ends it
+        assert seek(30) == (1011, [1041, 1011, 1012])
+        # more builds than days, the steps double until a later day
+        for build_id in range(1012, 1016):
+            fake.summaries[(slot, build_id)] = dict(
+                fake.summaries[(slot, build_id)],
+                date=fake.summaries[(slot, 1011)]["date"],
+            )
+        assert seek(30) == (
+            1015,
+            [1041, 1011, 1012, 1014, 1018, 1016, 1015],
+        )
+    finally:
+        fake.stop()
+
+
+def test_watch_date(monkeypatch):
+    from click.testing import CliRunner
+    import run
+
+    dates = []
+    monkeypatch.setattr(
+        StatusChecker,
+        "watch",
+        lambda self, date_to_check, **kwargs: dates.append(date_to_check),
+    )
+    args = ["watch", "--no-cache", "--no-history"]
+    today = date.today().strftime("%Y-%m-%d")
+    for extra in ([], ["--date", today]):
+        outcome = CliRunner().invoke(run.cli, args + extra)
+        assert outcome.exit_code == 0, outcome.output
+    # only without a date the report follows the current day
+    assert dates == [None, datetime.strptime(today, "%Y-%m-%d")]
+
+
+def test_parquet_without_filepath(fake):
+    from click.testing import CliRunner
+    import run
+
+    outcome = CliRunner().invoke(
+        run.cli,
+        [
+            "current-status",
+            "--no-cache",
+            "--no-history",
+            "--format",
+            "parquet",
+        ],
+    )
+    assert outcome.exit_code == 2
+    assert "--filepath" in outcome.output
+    # nothing is downloaded
+    assert fake.hits == []
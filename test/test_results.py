@@ -0,0 +1,127 @@
+import render
+from results import (
+    BuildResults,
+    MergeRequest,
+    Status,
+)
+from status_checker import (
+    StatusChecker,
+    platformColumns,
+)
+
+
+def test_build_results():
+    results = BuildResults(
+        StatusChecker.result_types,
+        StatusChecker.parsed_result_type,
+    )
+    assert results.empty
+    results.set_platforms(
+        ["x86_64_v2-el9-gcc13-opt", "armv8.1_a"], ["a", "b"], 3
+    )
+    row = results.add_project("Gauss", [MergeRequest("Gauss", 123)])
+    results.counts[row, 0] = [5, 0, 10, 2]
+    results.status[row, 1, 0] = Status.UNKNOWN
+    results.counts[row, 1, 2:] = [7, 0]
+    row = results.add_project("LHCb")
+    results.status[row, :, :] = Status.UNKNOWN
+    assert not results.empty
+    assert results.format().tolist() == [
+        ["W:5 E:0 / P:10 F:2", "UNKNOWN / P:7 F:0"],
+        ["UNKNOWN / UNKNOWN", "UNKNOWN / UNKNOWN"],
+    ]
+    assert results.colours().tolist() == [["red", "green"], ["black", "black"]]
+    assert results.totals("FAIL") == {"Gauss": 2}
+    assert results.totals("errors") == {}
+    assert results.rows()[0][:2] == ["Gauss", "!123"]
+
+
+def test_html_table():
+    results = BuildResults(
+        StatusChecker.result_types,
+        StatusChecker.parsed_result_type,
+    )
+    results.set_platforms(["x86_64_v2-el9-gcc13-opt"], ["a"], 1)
+    row = results.add_project("Gauss<1>")
+    results.counts[row, 0] = [0, 1, 10, 0]
+    table = render.html_table(results)
+    assert table.startswith('<table class="nightly">')
+    assert "<td>Gauss&lt;1&gt;</td>" in table
+    assert '<td class="red">W:0 E:1 / P:10 F:0</td>' in table
+    assert "td.red { color: red; }" in render.HTML_STYLE
+
+
+def test_compare_counters():
+    def build(counts):
+        results = BuildResults(
+            StatusChecker.result_types,
+            StatusChecker.parsed_result_type,
+        )
+        results.set_platforms(
+            ["a-opt", "b-opt", "c-opt", "d-opt"], ["a", "b", "c", "d"], 1
+        )
+        row = results.add_project("Gauss")
+        results.counts[row] = counts
+        return results
+
+    previous = build(
+        [[0, 0, 10, 2], [0, 30, 10, 0], [3, 0, 10, 0], [0, 1, 10, 0]]
+    )
+    current = build(
+        [[0, 0, 10, 40], [0, 1, 10, 0], [3, 0, 12, 0], [0, 1, 10, 0]]
+    )
+    # the cells stay red or orange, only their counters change
+    assert current.severity().tolist() == previous.severity().tolist()
+    changes = current.compare(previous)
+    assert [(c.platform, c.change) for c in changes] == [
+        ("a-opt", "regressed"),
+        ("b-opt", "recovered"),
+    ]
+    assert changes[0].previous == "W:0 E:0 / P:10 F:2"
+    assert changes[0].current == "W:0 E:0 / P:10 F:40"
+    assert changes[0].colour == changes[0].previous_colour == "red"
+
+
+def test_platform_columns():
+    platforms = (
+        "x86_64_v2-el9-gcc12-opt",
+        "x86_64_v2-el9-gcc12-dbg",
+        "x86_64_v2-centos7-gcc12-opt",
+        "x86_64_v2-centos7-gcc12-dbg",
+        "armv8.1_a-el9-gcc13-opt",
+    )
+    assert platformColumns(platforms) == (
+        "x86_64_v2-el9-gcc12-opt",
+        "*-dbg!1",
+        "*-centos7-gcc12-opt",
+        "*-dbg!2",
+        "armv8.1_a-el9-gcc13-opt",
+    )
+    # the columns are computed once per platform set
+    assert platformColumns(platforms) is platformColumns(platforms)
+
+
+def test_failed_MRs():
+    checker = StatusChecker(project_names=["Gauss", "Gaussino"])
+    parsed = {
+        "aborted": False,
+        "date": "2024-03-10",
+        "projects": [
+            {
+                "name": name,
+                "enabled": True,
+                "checkout": {"warnings": warnings},
+                "results": {},
+            }
+            for name, warnings in (
+                ("Gauss", ["Gauss!12 and Gaussino!3", "MyGauss!345"]),
+                ("Gaussino", ["Gauss!12", "Gaussino!3 (conflict)"]),
+            )
+        ],
+    }
+    results = checker._parse_build_info(parsed)[0]
+    assert results.failed_MRs == [
+        [MergeRequest("Gauss", 12), MergeRequest("Gauss", 345)],
+        [MergeRequest("Gaussino", 3)],
+    ]
+    assert results.rows()[0][1] == "!12,!345"
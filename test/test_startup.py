@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def loaded_modules(code: str) -> set:
+    """Return the modules imported by a fresh interpreter running code."""
+    outcome = subprocess.run(
+        [sys.executable, "-c", code + "\nimport sys; print(*sys.modules)"],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return set(outcome.stdout.split())
+
+
+def test_cli_startup_is_light():
+    modules = loaded_modules("import run")
+    for heavy in ("pandas", "numpy", "requests", "tabulate"):
+        assert heavy not in modules
+
+
+def test_tables_do_not_need_pandas():
+    modules = loaded_modules(
+        "from status_checker import StatusChecker\n"
+        "StatusChecker()._parse_build_info({'aborted': True, 'date': ''})"
+    )
+    assert "numpy" in modules
+    assert "pandas" not in modules
@@ -0,0 +1,62 @@
+import io
+import json
+import pytest
+from status_checker import StatusChecker
+
+pytest.importorskip("ijson")
+
+from streaming import parse_summary  # noqa: E402
+
+
+def test_parse_summary():
+    summary = {
+        "slot": "lhcb-sim11",
+        "date": "2024-03-10",
+        "aborted": False,
+        "platforms": ["armv8.1_a-el9-gcc13-opt", "x86_64_v2-el9-gcc13-opt"],
+        "projects": [
+            {
+                "name": "Gauss",
+                "enabled": True,
+                "checkout": {"warnings": ["Gauss!123"], "log": "..."},
+                "results": {
+                    "armv8.1_a-el9-gcc13-opt": {
+                        "build": {"warnings": 1, "errors": 0, "log": "..."},
+                        "tests": None,
+                    },
+                    "x86_64_v2-el9-gcc13-dbg": {"build": {"errors": 1}},
+                },
+            },
+            {
+                "name": "Moore",
+                "enabled": False,
+                "checkout": {"warnings": []},
+                "results": {},
+            },
+        ],
+    }
+    parsed = parse_summary(
+        io.BytesIO(json.dumps(summary).encode()),
+        ["Gauss"],
+        ["armv8.1_a-el9-gcc13-opt"],
+        StatusChecker.result_types,
+    )
+    assert parsed == {
+        "date": "2024-03-10",
+        "aborted": False,
+        "platforms": summary["platforms"],
+        "projects": [
+            {
+                "name": "Gauss",
+                "enabled": True,
+                "checkout": {"warnings": ["Gauss!123"]},
+                "results": {
+                    "armv8.1_a-el9-gcc13-opt": {
+                        "build": {"warnings": 1, "errors": 0},
+                        "tests": None,
+                    },
+                },
+            },
+            {"name": "Moore", "enabled": False},
+        ],
+    }
@@ -0,0 +1,40 @@
+import pytest
+from test.fake_nightlies import FakeNightlies
+from cache import SummaryCache
+from profiling import Profiler
+from transport import Transport
+
+
+@pytest.fixture
+def fake():
+    fake = FakeNightlies(n_slots=1, n_days=1).start()
+    yield fake
+    fake.stop()
+
+
+def test_not_modified_page(fake, tmp_path):
+    profiler = Profiler()
+    cache = SummaryCache(path=str(tmp_path / "cache.sqlite"))
+    page = Transport(cache=cache, profiler=profiler).get_page(
+        fake.main_page_url
+    )
+    assert page == fake.main_page().encode()
+    # the ETag of the page is sent again, also by a new transport
+    transport = Transport(cache=cache, profiler=profiler)
+    assert transport.get_page(fake.main_page_url) == page
+    assert transport.get_page(fake.main_page_url) == page
+    statuses = [request["status"] for request in profiler.requests]
+    assert statuses == [200, 304, 304]
+
+
+def test_retry_unavailable(fake, monkeypatch):
+    monkeypatch.setattr(Transport, "backoff_factor", 0.01)
+    fake.unavailable = 2
+    url = f"{fake.api_page_url}/lhcb-slot0/1001/summary"
+    response = Transport().get(url)
+    assert response.status_code == 200
+    assert response.json()["build_id"] == 1001
+    assert fake.hits.count("/api/v1/nightly/lhcb-slot0/1001/summary") == 3
+    # the errors are returned once the retries are exhausted
+    fake.unavailable = 2
+    assert Transport(retries=1).get(url).status_code == 503
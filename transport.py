@@ -0,0 +1,125 @@
+import logging
+import time
+from cache import SummaryCache
+from profiling import Profiler
+
+
+class Transport:
+    """HTTP session shared by all the requests of a checker.
+
+    Connections to the nightlies website are pooled and kept alive,
+    failed requests (connection errors and 5xx responses) are retried
+    with an exponential backoff. requests is imported only when
+    the first transport is created. With a recorder (see replay.py),
+    the content of every successful response which is not streamed
+    is recorded."""
+
+    # (connect, read) timeouts in seconds
+    timeout = (10, 60)
+
+    retries = 3
+
+    backoff_factor = 0.5
+
+    retry_statuses = (500, 502, 503, 504)
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        timeout: float = 0,
+        retries: int = -1,
+        cache: SummaryCache = None,
+        profiler: Profiler = None,
+        recorder=None,
+    ):
+        if timeout:
+            self.timeout = (self.timeout[0], timeout)
+        if retries >= 0:
+            self.retries = retries
+        self._cache = cache
+        self._profiler = profiler or Profiler()
+        self._pages = {}
+        self._recorder = recorder
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.retry_statuses,
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(
+        self,
+        url: str,
+        **kwargs,
+    ):
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        response = self.session.get(url, **kwargs)
+        if kwargs.get("stream"):
+            size = int(response.headers.get("Content-Length", 0))
+        else:
+            size = len(response.content)
+        self._profiler.request(
+            url,
+            size,
+            time.perf_counter() - start,
+            response.status_code,
+        )
+        if (
+            self._recorder
+            and response.status_code == 200
+            and not kwargs.get("stream")
+        ):
+            self._recorder.put(url, response.content)
+        return response
+
+    def get_page(
+        self,
+        url: str,
+    ) -> bytes:
+        """Return the content of the page, asking the server to send it
+        only if it was modified since it was fetched last time."""
+        page = self._pages.get(url)
+        if page is None and self._cache:
+            page = self._cache.get_page(url)
+        headers = {}
+        if page:
+            etag, last_modified, _ = page
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        response = self.get(url, headers=headers)
+        if page and response.status_code == 304:
+            logging.debug(f"'{url}' not modified, using the stored copy.")
+            self._pages[url] = page
+            if self._recorder:
+                self._recorder.put(url, page[2])
+            return page[2]
+        response.raise_for_status()
+        page = (
+            response.headers.get("ETag", ""),
+            response.headers.get("Last-Modified", ""),
+            response.content,
+        )
+        if page[0] or page[1]:
+            self._pages[url] = page
+            if self._cache:
+                self._cache.put_page(url, *page)
+        return response.content
+
+    def close(self):
+        self.session.close()
@@ -1,13 +1,13 @@
-import requests
 import logging
-import re
 
 
 def request(get_response):
     def wrapper(*args, **kwargs):
+        import requests
+
         try:
-            get_response(*args, **kwargs)
-        except requests.exceptions.HTTPError as err:
+            return get_response(*args, **kwargs)
+        except requests.exceptions.RequestException as err:
             msg = (
                 "Something went wrong trying to access the "
                 "LHCb nightly configuration website. "
@@ -18,14 +18,3 @@ def request(get_response):
             raise err
 
     return wrapper
-
-
-def color_values(value: str):
-    color = "black"
-    if re.search(r"(?:E:|F:)0", value):
-        color = "green"
-    if re.search(r"W:[1-9][0-9]{0,3}", value):
-        color = "orange"
-    if re.search(r"(?:E:|F:)[1-9][0-9]{0,3}", value):
-        color = "red"
-    return f"color: {color}"